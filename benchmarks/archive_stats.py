@@ -0,0 +1,60 @@
+import os
+import time
+import random
+import argparse
+import tempfile
+import statistics
+
+from utils.archive import MogiArchive
+from utils.mogi import Mogi
+from benchmarks.mogi_model import FORMATS
+
+
+def make_finished_mogi(tags):
+    format = random.choice(list(FORMATS))
+    mogi = Mogi(format, random.sample(tags, FORMATS[format]))
+    spots = list(range(1, 13))
+    for race in range(12):
+        random.shuffle(spots)
+        for team in range(mogi.amount_of_teams):
+            mogi.set_spots(race, team, spots[team * format:(team + 1) * format])
+    return mogi
+
+
+def measure(query, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        query()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1e3, max(timings) * 1e3
+
+
+def main(args):
+    random.seed(args.seed)
+    tags = [f"T{index}" for index in range(args.tags)]
+    with tempfile.TemporaryDirectory() as directory:
+        archive = MogiArchive(os.path.join(directory, "archive.sqlite3"))
+        start = time.perf_counter()
+        for index in range(args.mogis):
+            archive.store(f"{index % args.guilds}-{index}", make_finished_mogi(tags), "finished")
+        print(f"archived {args.mogis} mogis in {time.perf_counter() - start:.2f} s")
+        queries = {
+            "tag_stats": lambda: archive.tag_stats("0", random.choice(tags)),
+            "head_to_head": lambda: archive.head_to_head("0", random.choice(tags)),
+            "guild_stats": lambda: archive.guild_stats("0"),
+        }
+        for name, query in queries.items():
+            median, worst = measure(query, args.repeats)
+            print(f"{name:>12}: median {median:8.3f} ms, max {worst:8.3f} ms")
+        archive.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the stats queries over an archive of finished mogis")
+    parser.add_argument("--mogis", type=int, default=10000)
+    parser.add_argument("--guilds", type=int, default=1)
+    parser.add_argument("--tags", type=int, default=200)
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,99 @@
+import asyncio
+import itertools
+
+message_ids = itertools.count(1)
+
+
+class FakeUser:
+    def __init__(self, id):
+        self.id = id
+        self.name = f"user{id}"
+        self.display_name = self.name
+
+
+class FakePermissions:
+    manage_messages = True
+
+
+class FakeTyping:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class FakeMessage:
+    def __init__(self, channel, id):
+        self.channel = channel
+        self.id = id
+
+    async def edit(self, **kwargs):
+        await self.channel.api_call(kwargs)
+
+    async def pin(self):
+        await self.channel.api_call({})
+
+
+class FakeChannel:
+    def __init__(self, id, api_latency=0.0):
+        self.id = id
+        self.api_latency = api_latency
+        self.api_calls = 0
+        self.uploaded_bytes = 0
+
+    async def api_call(self, kwargs):
+        self.api_calls += 1
+        files = kwargs.get("attachments") or [kwargs.get("file")]
+        self.uploaded_bytes += sum(file.fp.getbuffer().nbytes for file in files if file is not None)
+        await asyncio.sleep(self.api_latency)
+
+    def typing(self):
+        return FakeTyping()
+
+    def permissions_for(self, user):
+        return FakePermissions()
+
+    def get_partial_message(self, message_id):
+        return FakeMessage(self, message_id)
+
+    async def send(self, content=None, **kwargs):
+        await self.api_call(kwargs)
+        return FakeMessage(self, next(message_ids))
+
+
+class FakeResponse:
+    def __init__(self, channel):
+        self.channel = channel
+        self.messages = []
+
+    def is_done(self):
+        return len(self.messages) != 0
+
+    async def send_message(self, content=None, **kwargs):
+        await self.channel.api_call(kwargs)
+        self.messages.append(content)
+
+    async def defer(self, **kwargs):
+        await self.channel.api_call(kwargs)
+
+
+class FakeFollowup:
+    def __init__(self, channel):
+        self.channel = channel
+        self.messages = []
+
+    async def send(self, content=None, **kwargs):
+        await self.channel.api_call(kwargs)
+        self.messages.append(content)
+
+
+class FakeInteraction:
+    def __init__(self, guild_id, channel, user):
+        self.guild_id = guild_id
+        self.channel = channel
+        self.channel_id = channel.id
+        self.user = user
+        self.message = None
+        self.response = FakeResponse(channel)
+        self.followup = FakeFollowup(channel)
@@ -0,0 +1,69 @@
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+
+from utils.state import MogiStateStore
+from utils.storage import JsonStorage
+from benchmarks.mogi_model import make_mogis
+
+
+class Heartbeat:
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.max_blocked = 0
+        self.task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.max_blocked = max(self.max_blocked, loop.time() - start - self.interval)
+
+    async def measure(self, coroutine):
+        self.max_blocked = 0
+        self.task = asyncio.create_task(self._run())
+        await asyncio.sleep(self.interval * 5)
+        start = time.perf_counter()
+        await coroutine
+        duration = time.perf_counter() - start
+        await asyncio.sleep(self.interval * 5)
+        self.task.cancel()
+        return self.max_blocked, duration
+
+
+async def legacy_flush(path, store):
+    # what update_current_data used to do, pretty-printed straight into the live file on the event loop
+    with open(path, "w") as json_file:
+        json.dump(store.to_json(), json_file, indent=4)
+
+
+async def main(args):
+    random.seed(args.seed)
+    heartbeat = Heartbeat()
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            store = MogiStateStore(JsonStorage(os.path.join(directory, f"{size}.json")))
+            store.servers = {f"{index}": {"restricted_users": []} for index in range(size)}
+            store.current_locations = make_mogis(size)
+            before, before_duration = await heartbeat.measure(legacy_flush(os.path.join(directory, f"{size}.legacy.json"), store))
+            store.mark_dirty(location_id=next(iter(store.current_locations)))
+            after, after_duration = await heartbeat.measure(store.flush())
+            legacy_size = os.path.getsize(os.path.join(directory, f"{size}.legacy.json"))
+            size_after = os.path.getsize(store.storage.path)
+            print(
+                f"{size:>6} mogis: blocked {before * 1e3:9.3f} ms -> {after * 1e3:8.3f} ms, "
+                f"flush {before_duration * 1e3:9.3f} ms -> {after_duration * 1e3:9.3f} ms, "
+                f"file {legacy_size / 1024:8.1f} KiB -> {size_after / 1024:8.1f} KiB"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure how long a JSON state flush blocks the event loop, pretty-printed on the loop against compact in a worker thread")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
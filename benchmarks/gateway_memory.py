@@ -0,0 +1,95 @@
+import asyncio
+import argparse
+import multiprocessing
+
+import discord
+
+from utils.gateway import INTENT_PROFILES, client_options
+
+TIMESTAMP = "2024-01-01T00:00:00+00:00"
+
+
+def resident_memory():
+    with open("/proc/self/status") as status_file:
+        for line in status_file:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def make_user(user_id):
+    return {"id": str(user_id), "username": f"user{user_id}", "discriminator": "0", "global_name": f"User {user_id}", "avatar": None}
+
+
+def make_member(user_id):
+    return {"user": make_user(user_id), "roles": [], "joined_at": TIMESTAMP, "deaf": False, "mute": False, "flags": 0}
+
+
+def make_guild(guild_id, members, intents):
+    # the gateway only sends what the intents allow
+    member_ids = range(guild_id * 100000, guild_id * 100000 + members)
+    return {
+        "id": str(guild_id),
+        "name": f"Guild {guild_id}",
+        "owner_id": str(member_ids[0]),
+        "member_count": members,
+        "large": members > 250,
+        "roles": [{"id": str(guild_id), "name": "@everyone", "permissions": "0", "position": 0, "color": 0, "hoist": False, "managed": False, "mentionable": False}],
+        "channels": [
+            {"id": str(guild_id * 100 + channel), "type": 0, "name": f"mogi-{channel}", "position": channel, "permission_overwrites": []}
+            for channel in range(10)
+        ],
+        "members": [make_member(user_id) for user_id in member_ids] if intents.members else [],
+        "presences": [
+            {"user": {"id": str(user_id)}, "status": "online", "activities": [], "client_status": {"desktop": "online"}}
+            for user_id in member_ids[::10]
+        ] if intents.presences else [],
+    }
+
+
+def make_message(message_id, guild_id, author_id):
+    return {
+        "id": str(message_id), "channel_id": str(guild_id * 100), "guild_id": str(guild_id), "author": make_user(author_id),
+        "member": {"roles": [], "joined_at": TIMESTAMP, "deaf": False, "mute": False, "flags": 0}, "content": "A 1 2, B 3 4" * 5,
+        "timestamp": TIMESTAMP, "edited_timestamp": None, "tts": False, "mention_everyone": False, "mentions": [],
+        "mention_roles": [], "attachments": [], "embeds": [], "pinned": False, "type": 0,
+    }
+
+
+def measure(profile, guilds, members, messages, results):
+    async def run():
+        options = client_options(profile)
+        # members arrive with the guilds here, nothing to chunk
+        options["chunk_guilds_at_startup"] = False
+        client = discord.Client(**options)
+        state = client._connection
+        state.user = discord.ClientUser(state=state, data=make_user(1))
+        intents = options["intents"]
+        before = resident_memory()
+        for guild_id in range(1, guilds + 1):
+            state.parse_guild_create(make_guild(guild_id, members, intents))
+            if intents.guild_messages:
+                for message in range(messages):
+                    state.parse_message_create(make_message(guild_id * 10000 + message, guild_id, guild_id * 100000 + message % members))
+        results[profile] = (resident_memory() - before, sum(len(guild.members) for guild in client.guilds), len(client.cached_messages))
+    asyncio.run(run())
+
+
+def main(args):
+    with multiprocessing.Manager() as manager:
+        results = manager.dict()
+        for profile in INTENT_PROFILES:
+            # a fresh process for every profile, memory freed by the previous one would hide growth
+            process = multiprocessing.Process(target=measure, args=(profile, args.guilds, args.members, args.messages, results))
+            process.start()
+            process.join()
+            memory, cached_members, cached_messages = results[profile]
+            print(f"{profile:>8}: {memory / 2 ** 20:8.1f} MiB resident for {args.guilds} guilds, {cached_members} cached members, {cached_messages} cached messages")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the resident memory of every intents profile over simulated large guilds")
+    parser.add_argument("--guilds", type=int, default=200)
+    parser.add_argument("--members", type=int, default=2000)
+    parser.add_argument("--messages", type=int, default=50)
+    main(parser.parse_args())
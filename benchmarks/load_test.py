@@ -0,0 +1,192 @@
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import multiprocessing
+
+from cogs.commands import BotCommands
+from utils.state import state_store
+from utils.storage import create_storage, ShardedJsonStorage
+from utils.journal import MogiJournal
+from utils.table_client import table_client
+from utils.table_renderer import table_renderer
+from utils.image_cache import table_image_cache
+from utils.live_standings import live_standings
+from utils.metrics import metrics
+from benchmarks.stub_server import StubTableServer
+from benchmarks.fake_discord import FakeChannel, FakeInteraction, FakeUser
+
+TAGS = ["A", "B", "C", "D", "E", "F"]
+
+
+def serve_stub(latency, port, ready):
+    async def main():
+        server = StubTableServer(latency, port)
+        await server.start()
+        ready.set()
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+
+def read_process_io():
+    try:
+        with open("/proc/self/io") as io_file:
+            return {key: int(value) for key, value in (line.split(": ") for line in io_file)}
+    except OSError:
+        return None
+
+
+def percentiles(samples):
+    if len(samples) == 0:
+        return {"count": 0}
+    samples = sorted(samples)
+
+    def at(q):
+        return samples[min(len(samples) - 1, int(len(samples) * q))] * 1e3
+
+    return {
+        "count": len(samples),
+        "p50_ms": round(at(0.50), 3),
+        "p95_ms": round(at(0.95), 3),
+        "p99_ms": round(at(0.99), 3),
+        "max_ms": round(samples[-1] * 1e3, 3)
+    }
+
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.cog = BotCommands(None)
+        self.timings = {}
+        self.channels = []
+        self.loop_lag = []
+        self.running = True
+
+    async def call(self, name, command, interaction, *args):
+        start = time.perf_counter()
+        await command.callback(self.cog, interaction, *args)
+        self.timings.setdefault(name, []).append(time.perf_counter() - start)
+
+    async def sample_loop_lag(self):
+        interval = self.args.lag_interval
+        while self.running:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            self.loop_lag.append(max(0.0, time.perf_counter() - start - interval))
+
+    async def play_mogi(self, guild_id, channel_id):
+        channel = FakeChannel(channel_id, self.args.api_latency)
+        self.channels.append(channel)
+        user = FakeUser(guild_id * 100 + channel_id)
+        spots = list(range(1, 13))
+
+        def interaction():
+            return FakeInteraction(guild_id, channel, user)
+
+        async def submit(tag, team_spots):
+            await asyncio.sleep(random.random() * self.args.think_time)
+            await self.call("spots", self.cog.spots, interaction(), tag, team_spots)
+
+        await asyncio.sleep(random.random() * self.args.think_time)
+        await self.call("start", self.cog.start, interaction(), 2, " ".join(TAGS))
+        for race in range(12):
+            random.shuffle(spots)
+            # teams submit at the same time, the last one is filled in automatically once the other five entered their spots
+            await asyncio.gather(*(
+                submit(tag, " ".join(map(str, spots[team * 2:team * 2 + 2]))) for team, tag in enumerate(TAGS[:-1])
+            ))
+            if race != 11:
+                await self.call("show_standings", self.cog.show_standings, interaction())
+
+    async def run(self):
+        for guild_id in range(1, self.args.guilds + 1):
+            state_store.servers[str(guild_id)] = {
+                "restricted_users": [], "table_renderer": self.args.renderer, "standings_mode": self.args.standings_mode
+            }
+        lag_task = asyncio.create_task(self.sample_loop_lag())
+        io_before = read_process_io()
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            self.play_mogi(guild_id, channel_id)
+            for guild_id in range(1, self.args.guilds + 1) for channel_id in range(1, self.args.channels + 1)
+        ))
+        await state_store.flush()
+        wall_seconds = time.perf_counter() - start
+        io_after = read_process_io()
+        self.running = False
+        await lag_task
+
+        io = None
+        if io_before is not None and io_after is not None:
+            io = {key: io_after[key] - io_before[key] for key in io_after}
+        return {
+            "config": vars(self.args),
+            "wall_seconds": round(wall_seconds, 3),
+            "commands": {name: percentiles(samples) for name, samples in self.timings.items()},
+            "loop_lag": percentiles(self.loop_lag),
+            "io": io,
+            "discord_api_calls": sum(channel.api_calls for channel in self.channels),
+            "discord_upload_bytes": sum(channel.uploaded_bytes for channel in self.channels),
+            "image_cache": {"hits": table_image_cache.hits, "misses": table_image_cache.misses},
+            "render_requests": {label: value for (name, label), value in metrics.counters.items() if name == "render_requests_total"}
+        }
+
+
+async def main(args):
+    random.seed(args.seed)
+    ready = multiprocessing.Event()
+    stub = multiprocessing.Process(target=serve_stub, args=(args.table_latency, args.port, ready), daemon=True)
+    stub.start()
+    ready.wait()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            journal = MogiJournal(os.path.join(directory, "state.journal")) if args.journal else None
+            if args.backend == "shards":
+                # a fresh directory, the bot's own state file mustn't be imported
+                storage = ShardedJsonStorage(os.path.join(directory, "state"), import_path=None)
+            else:
+                suffix = "sqlite3" if args.backend == "sqlite" else "json"
+                storage = create_storage(args.backend, os.path.join(directory, f"state.{suffix}"))
+            await state_store.load(storage, journal)
+            state_store.start(args.flush_interval)
+            live_standings.min_interval = args.live_interval
+            await table_client.start(f"http://127.0.0.1:{args.port}/table.png?data=")
+            if args.renderer == "local":
+                table_renderer.start()
+            result = await LoadTest(args).run()
+            live_standings.close()
+            await state_store.close()
+            await table_client.close()
+            table_renderer.close()
+    finally:
+        stub.terminate()
+
+    report = json.dumps(result, indent=2)
+    if args.output is not None:
+        with open(args.output, "w") as output_file:
+            output_file.write(report)
+    print(report)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play full 12-race mogis in N guilds x M channels against the real cog and report latencies as JSON")
+    parser.add_argument("--guilds", type=int, default=10)
+    parser.add_argument("--channels", type=int, default=5)
+    parser.add_argument("--backend", choices=["json", "sqlite", "shards"], default="json")
+    parser.add_argument("--journal", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--renderer", choices=["lorenzi", "local"], default="lorenzi")
+    parser.add_argument("--table-latency", type=float, default=0.05, help="seconds the stub table endpoint waits before answering")
+    parser.add_argument("--api-latency", type=float, default=0.02, help="seconds every fake Discord API call takes")
+    parser.add_argument("--think-time", type=float, default=0.05, help="maximum random pause between commands of one channel")
+    parser.add_argument("--standings-mode", choices=["upload", "live"], default="upload")
+    parser.add_argument("--live-interval", type=float, default=2.0, help="minimum seconds between two edits of a live standings message")
+    parser.add_argument("--flush-interval", type=float, default=5)
+    parser.add_argument("--lag-interval", type=float, default=0.01)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    asyncio.run(main(parser.parse_args()))
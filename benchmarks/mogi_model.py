@@ -0,0 +1,95 @@
+import copy
+import time
+import random
+import asyncio
+import argparse
+import tracemalloc
+
+from utils.mogi import Mogi
+from utils.state import MogiStateStore
+
+FORMATS = {2: 6, 3: 4, 4: 3}
+
+
+def make_mogis(amount):
+    mogis = {}
+    for index in range(amount):
+        format = random.choice(list(FORMATS))
+        mogi = Mogi(format, [f"T{team}" for team in range(FORMATS[format])])
+        spots = list(range(1, 13))
+        for race in range(random.randrange(12)):
+            random.shuffle(spots)
+            for team in range(mogi.amount_of_teams):
+                mogi.set_spots(race, team, spots[team * format:(team + 1) * format])
+        mogis[f"{index}-{index}"] = mogi
+    return mogis
+
+
+def measure_memory(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    data = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return data, after - before
+
+
+async def run_legacy_spots(locations, entries):
+    locks = {location_id: asyncio.Lock() for location_id in locations}
+
+    async def spots(location_id, race, team, spots):
+        async with locks[location_id]:
+            location = copy.deepcopy(locations[location_id])
+            location["races"][f"race{race}"][f"team{team}"] = spots
+            locations[location_id] = location
+        await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(spots(*entry) for entry in entries))
+    return time.perf_counter() - start
+
+
+async def run_mogi_spots(store, entries):
+    async def spots(location_id, race, team, spots):
+        async with store.transaction(location_id) as transaction:
+            transaction.mogi.set_spots(race, team, spots)
+        await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(spots(*entry) for entry in entries))
+    return time.perf_counter() - start
+
+
+def make_entries(mogis, amount):
+    entries = []
+    location_ids = list(mogis)
+    for _ in range(amount):
+        location_id = random.choice(location_ids)
+        mogi = mogis[location_id]
+        entries.append((location_id, random.randrange(12), random.randrange(mogi.amount_of_teams), random.sample(range(1, 13), mogi.format)))
+    return entries
+
+
+async def main(args):
+    random.seed(args.seed)
+    mogis = make_mogis(args.mogis)
+    entries = make_entries(mogis, args.entries)
+
+    legacy_locations, legacy_bytes = measure_memory(lambda: {location_id: mogi.to_json() for location_id, mogi in mogis.items()})
+    compact_mogis, mogi_bytes = measure_memory(lambda: {location_id: mogi.copy() for location_id, mogi in mogis.items()})
+    print(f"memory per mogi: legacy dicts {legacy_bytes / args.mogis:.0f} B, Mogi {mogi_bytes / args.mogis:.0f} B")
+
+    store = MogiStateStore()
+    store.current_locations = compact_mogis
+    legacy_seconds = await run_legacy_spots(legacy_locations, entries)
+    mogi_seconds = await run_mogi_spots(store, entries)
+    print(f"time per /spots entry: legacy dicts {legacy_seconds / args.entries * 1e6:.1f} us, "
+          f"Mogi {mogi_seconds / args.entries * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the legacy dict layout with the compact Mogi model")
+    parser.add_argument("--mogis", type=int, default=1000)
+    parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,57 @@
+import os
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+
+from utils.state import MogiStateStore
+from utils.storage import JsonStorage, ShardedJsonStorage
+from benchmarks.mogi_model import make_mogis
+
+
+def make_state(guilds, mogis_per_guild):
+    servers = {f"{guild}": {"restricted_users": [guild], "table_renderer": "local"} for guild in range(guilds)}
+    locations = {}
+    for location_id, mogi in make_mogis(guilds * mogis_per_guild).items():
+        guild = int(location_id.split("-")[0]) % guilds
+        locations[f"{guild}-{location_id.split('-')[1]}"] = mogi
+    return servers, locations
+
+
+async def measure_startup(storage, guild_id):
+    store = MogiStateStore(storage)
+    start = time.perf_counter()
+    await store.load()
+    loaded = time.perf_counter()
+    # the first command in a guild
+    async with store.transaction(f"{guild_id}-0"):
+        pass
+    first_command = time.perf_counter()
+    return loaded - start, first_command - loaded
+
+
+async def main(args):
+    random.seed(args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        for guilds in args.guilds:
+            servers, locations = make_state(guilds, args.mogis_per_guild)
+            single = JsonStorage(os.path.join(directory, f"{guilds}.json"))
+            single.save(servers, locations, set(), set())
+            shards = ShardedJsonStorage(os.path.join(directory, f"{guilds}.shards"), import_path=None)
+            shards.load()
+            shards.save(servers, locations, set(servers), set(locations))
+            for name, storage in (("single file", single), ("shards", shards)):
+                load_time, first_command_time = await measure_startup(storage, random.randrange(guilds))
+                print(f"{guilds:>6} guilds {name:>11}: startup {load_time * 1e3:9.2f} ms, first command {first_command_time * 1e3:7.2f} ms")
+            join_start = time.perf_counter()
+            shards.save({"new": {"restricted_users": []}}, {}, {"new"}, set())
+            print(f"{guilds:>6} guilds {'shards':>11}: joining a guild writes {os.path.getsize(shards._path('new'))} bytes in {(time.perf_counter() - join_start) * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the cold start with one state file against lazily loaded per guild files")
+    parser.add_argument("--guilds", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--mogis-per-guild", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,56 @@
+import os
+import time
+import random
+import argparse
+import tempfile
+
+from utils.storage import JsonStorage, atomic_write, encode_legacy_state, read_state_file, orjson, msgpack
+from benchmarks.mogi_model import make_mogis
+
+
+def measure(store, load, repeats):
+    store_timings, load_timings = [], []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        store()
+        store_timings.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        load()
+        load_timings.append(time.perf_counter() - start)
+    return min(store_timings), min(load_timings)
+
+
+def main(args):
+    random.seed(args.seed)
+    codecs = ["json"] + [name for name, module in (("orjson", orjson), ("msgpack", msgpack)) if module is not None]
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            mogis = make_mogis(size)
+            servers = {f"{index}": {"restricted_users": []} for index in range(size)}
+            legacy_path = os.path.join(directory, f"{size}.legacy.json")
+            formats = {"legacy": (
+                lambda: atomic_write(legacy_path, encode_legacy_state(servers, mogis)),
+                lambda: read_state_file(legacy_path),
+                legacy_path
+            )}
+            for codec in codecs:
+                storage = JsonStorage(os.path.join(directory, f"{size}.{codec}"), codec)
+                formats[f"v2 {codec}"] = (
+                    lambda storage=storage: storage.save(servers, mogis, set(), set()),
+                    storage.load,
+                    storage.path
+                )
+            for name, (store, load, path) in formats.items():
+                store_time, load_time = measure(store, load, args.repeats)
+                print(
+                    f"{size:>6} mogis {name:>10}: {os.path.getsize(path) / 1024:9.1f} KiB, "
+                    f"store {store_time * 1e3:8.2f} ms, load {load_time * 1e3:8.2f} ms"
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare size and load/store time of the legacy and the compact state formats")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,56 @@
+import os
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import statistics
+
+from utils.state import MogiStateStore
+from utils.storage import JsonStorage, SqliteStorage
+from benchmarks.mogi_model import make_mogis
+
+
+async def measure_writes(store, writes):
+    location_ids = list(store.current_locations)
+    timings = []
+    for _ in range(writes):
+        location_id = random.choice(location_ids)
+        async with store.transaction(location_id) as transaction:
+            mogi = transaction.mogi
+            mogi.set_spots(random.randrange(12), random.randrange(mogi.amount_of_teams), random.sample(range(1, 13), mogi.format))
+        start = time.perf_counter()
+        await store.flush()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def run_backend(name, storage, mogis, writes):
+    store = MogiStateStore(storage)
+    store.servers = {f"{index}": {"restricted_users": []} for index in range(len(mogis))}
+    store.current_locations = dict(mogis)
+    store.dirty_servers.update(store.servers)
+    store.dirty_locations.update(store.current_locations)
+    await store.flush()
+    timings = await measure_writes(store, writes)
+    await store.close()
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{name:>6} {len(mogis):>7} mogis: median {statistics.median(timings) * 1e3:8.3f} ms, p95 {p95 * 1e3:8.3f} ms")
+
+
+async def main(args):
+    random.seed(args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            mogis = make_mogis(size)
+            await run_backend("json", JsonStorage(os.path.join(directory, f"{size}.json")), mogis, args.writes)
+            await run_backend("sqlite", SqliteStorage(os.path.join(directory, f"{size}.sqlite3")), mogis, args.writes)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the latency of persisting one /spots entry for both storage backends")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--writes", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
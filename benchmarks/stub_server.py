@@ -0,0 +1,35 @@
+import asyncio
+
+from aiohttp import web
+
+from utils.table_renderer import Image, render_table
+
+
+class StubTableServer:
+    def __init__(self, latency=0.15, port=8765):
+        self.latency = latency
+        self.port = port
+        self.requests = 0
+        self.runner = None
+        self.png = b"\x89PNG\r\n\x1a\n"
+        if Image is not None:
+            self.png = render_table("#title Standings after race 1\nA 0\nB 0")
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.port}/table.png?data="
+
+    async def table(self, request):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        return web.Response(body=self.png, content_type="image/png")
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/table.png", self.table)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, "127.0.0.1", self.port).start()
+
+    async def close(self):
+        await self.runner.cleanup()
@@ -0,0 +1,72 @@
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+import urllib.parse
+
+from benchmarks.stub_server import StubTableServer
+from utils.table_client import TableImageClient
+from utils.table_renderer import LocalTableRenderer
+
+
+def make_table_text(index, amount_of_teams=6):
+    table_text = f"#title Standings after race {index % 12 + 1}"
+    for team in range(amount_of_teams):
+        table_text += f"\nT{team} {(index * 7 + team * 13) % 500}"
+    return table_text
+
+
+async def measure(render, renders, concurrency):
+    durations = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed(index):
+        async with semaphore:
+            start = time.perf_counter()
+            await render(make_table_text(index))
+            durations.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(timed(index) for index in range(renders)))
+    return time.perf_counter() - start, durations
+
+
+def report(name, total, durations):
+    durations.sort()
+    print(f"{name:>8}: total {total:.3f}s, "
+          f"mean {statistics.mean(durations) * 1000:.1f}ms, "
+          f"p95 {durations[int(len(durations) * 0.95) - 1] * 1000:.1f}ms")
+
+
+async def main(args):
+    server = StubTableServer(args.latency, args.port)
+    await server.start()
+    client = TableImageClient()
+    await client.start(server.base_url)
+    renderer = LocalTableRenderer(args.workers)
+    renderer.start()
+    try:
+        if not renderer.available:
+            sys.exit("Pillow is required for the local renderer")
+        await renderer.render(make_table_text(0))
+
+        async def remote(table_text):
+            return await client.fetch(client.base_url + urllib.parse.quote(table_text))
+
+        report("remote", *await measure(remote, args.renders, args.concurrency))
+        report("local", *await measure(renderer.render, args.renders, args.concurrency))
+    finally:
+        renderer.close()
+        await client.close()
+        await server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare local table rendering against the remote Lorenzi path")
+    parser.add_argument("--renders", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.15, help="simulated latency of the remote renderer in seconds")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--port", type=int, default=8765)
+    asyncio.run(main(parser.parse_args()))
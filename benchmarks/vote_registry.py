@@ -0,0 +1,38 @@
+import random
+import asyncio
+import argparse
+import tempfile
+import tracemalloc
+from unittest import mock
+
+from utils.votes import VoteRegistry
+
+
+async def main(args):
+    random.seed(args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        registry = VoteRegistry(f"{directory}/votes.json", ttl=args.ttl, max_per_location=args.max_per_location)
+        clock = 0.0
+        tracemalloc.start()
+        with mock.patch("utils.votes.time.time", lambda: clock):
+            for hour in range(args.hours + 1):
+                if hour != 0:
+                    for _ in range(args.votes_per_hour):
+                        clock += 3600 / args.votes_per_hour
+                        location_id = f"{random.randrange(args.locations)}-{random.randrange(10)}"
+                        # most votes are never finished, the buttons are just left alone
+                        await registry.create("revert", location_id, random.randrange(10 ** 6), [random.randrange(1, 13)], yes=[1])
+                if hour % max(args.hours // 8, 1) == 0:
+                    print(f"hour {hour:>4}: {len(registry.votes):>6} pending votes, {tracemalloc.get_traced_memory()[0] / 1024:9.1f} KiB traced")
+        tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate a long event with abandoned votes and report the pending votes and their memory")
+    parser.add_argument("--hours", type=int, default=48)
+    parser.add_argument("--votes-per-hour", type=int, default=200)
+    parser.add_argument("--locations", type=int, default=50)
+    parser.add_argument("--ttl", type=float, default=15 * 60)
+    parser.add_argument("--max-per-location", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
@@ -1,10 +1,26 @@
+import asyncio
+
 import discord
 from discord.ext import commands
 from discord import app_commands
 
+from utils.metrics import metrics
+from utils.sharding import coordinator
+
 class Administration(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        coordinator.register("stats", self.stats)
+        coordinator.register("shutdown", self.shutdown)
+
+    async def stats(self):
+        title = "" if self.bot.process is None else f"Process {self.bot.process} (shards {', '.join(map(str, self.bot.shard_ids))})\n"
+        return f"{title}{metrics.render_summary()}"
+
+    async def shutdown(self):
+        # the reply to the coordinator goes out before the bot is closed
+        asyncio.create_task(self.bot.close())
+        return "closing"
 
     @commands.Cog.listener()
     async def on_message(self, ctx):
@@ -14,8 +30,19 @@ class Administration(commands.Cog):
                 await ctx.channel.send("Done!")
                 print("The command tree was synced")
 
+            elif ctx.content.lower() == "stats":
+                for summary in await coordinator.broadcast("stats"):
+                    for start in range(0, len(summary), 1900):
+                        await ctx.channel.send(f"```\n{summary[start:start + 1900]}\n```")
+
+            elif ctx.content.lower() in ["dumpstats", "stats prometheus"]:
+                path = metrics.write_prometheus()
+                await ctx.channel.send(f"Metrics written to `{path}`", file=discord.File(path))
+
             elif ctx.content.lower() == "shutdown":
-                exit(f"Shut down by {ctx.author.name}")
+                print(f"Shut down by {ctx.author.name}")
+                await ctx.channel.send("Shutting down!")
+                await coordinator.broadcast("shutdown")
 
 
 async def setup(bot):
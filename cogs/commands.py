@@ -3,69 +3,182 @@ from discord.ext import commands
 from discord import app_commands
 
 import json
-import requests
+import time
 import asyncio
-from io import BytesIO
 import urllib.parse
+from io import BytesIO
+from typing import Literal
 
+from utils.state import state_store
+from utils.table_client import table_client
+from utils.table_renderer import table_renderer
+from utils.image_cache import table_image_cache
+from utils.render_scheduler import render_scheduler
+from utils.live_standings import live_standings
+from utils.metrics import metrics
+from utils.votes import vote_registry
+from utils.mogi import Mogi
+from utils.scoring import SPOT_POINTS
 
-async def open_current_data():
-    with open("cogs/current_data.json") as f:
-        current_data = json.load(f)
-        return current_data
 
 async def open_config():
     with open("config.json") as f:
         config = json.load(f)
         return config
 
-async def update_current_data(current_data):
-    with open("cogs/current_data.json", "w") as json_file:
-        json.dump(current_data, json_file, indent=4)
+
+# yes and no votes needed, the user who started the vote counts as a yes
+VOTES_NEEDED = {"revert": (3, 2), "restart": (2, 2)}
+VOTE_MESSAGES = {
+    "revert": {
+        "already_yes": "You have already voted to revert the race!",
+        "already_no": "You have already voted to not revert the race!",
+        "yes": "You voted to revert the race",
+        "no": "You voted to not revert the race",
+        "rejected": "This race was voted to not be reverted.",
+    },
+    "restart": {
+        "already_yes": "You have already voted to restart the mogi-standings!",
+        "already_no": "You have already voted not to restart the mogi-standings!",
+        "yes": "You voted to restart the mogi-standings",
+        "no": "You voted not to restart the mogi-standings",
+        "rejected": "The mogi-standings were voted to not be restarted",
+    },
+}
 
 
 class BotCommands(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
+    async def interaction_check(self, interaction):
+        interaction.extras["started"] = time.perf_counter()
+        if interaction.guild_id is None:
+            # mogis and settings are stored per guild, a DM has none
+            await interaction.response.send_message("This bot only works in servers!", ephemeral=True)
+            return False
+        await state_store.load_guild(str(interaction.guild_id))
+        return True
+
+    @commands.Cog.listener()
+    async def on_app_command_completion(self, interaction, command):
+        started = interaction.extras.get("started")
+        if started is not None:
+            metrics.observe("command_seconds", time.perf_counter() - started, command.qualified_name)
+
+    async def cog_app_command_error(self, interaction, error):
+        command = interaction.command
+        metrics.inc("command_errors_total", command.qualified_name if command is not None else None)
+
     @staticmethod
     async def get_location_id(interaction):
         location_id = f"{interaction.guild_id}-{interaction.channel.id}"
         return location_id
 
-    async def get_amount_of_teams(self, location_id):
-        current_data = await open_current_data()
-        return await self.convert_format_to_amount_of_teams(current_data["current_locations"][location_id]["format"])
+    @staticmethod
+    async def get_mogi(location_id):
+        return state_store.current_locations[location_id]
+
+    @staticmethod
+    async def get_amount_of_teams(mogi):
+        return mogi.amount_of_teams
+
+    @staticmethod
+    async def get_current_race(mogi):
+        return mogi.current_race
+
+    @staticmethod
+    async def get_table_renderer(server_id):
+        return state_store.servers.get(server_id, {}).get("table_renderer", "lorenzi")
 
     @staticmethod
-    async def get_current_race(location_id):
-        current_data = await open_current_data()
-        return current_data["current_locations"][location_id]["current_race"]
+    async def get_standings_mode(server_id):
+        return state_store.servers.get(server_id, {}).get("standings_mode", "upload")
 
     @staticmethod
-    async def get_table_image(location_id, current_race=None):
-        base_url_lorenzi = "https://gb.hlorenzi.com/table.png?data="
-        current_data = await open_current_data()
+    async def get_table_text(mogi, current_race=None):
         if current_race is None:
-            current_race = current_data["current_locations"][location_id]["current_race"]
-        teams = current_data["current_locations"][location_id]["teams"]
+            current_race = mogi.current_race
         table_text = f"#title Standings after race {current_race + 1}"
-        for team in teams:
-            tag = teams[team]["tag"]
-            score = teams[team]["total_score"]
+        for team, tag in enumerate(mogi.tags):
+            score = mogi.total_score(team)
             table_text += f"\n{tag} {score}"
-        encoded_table_text = urllib.parse.quote(table_text)
-        link = base_url_lorenzi + encoded_table_text
-        print(link)
-        table_data = requests.get(link)
-        table_bytes = BytesIO(table_data.content)
+        return table_text
+
+    @staticmethod
+    def resolve_renderer(renderer):
+        if renderer != "local" or not table_renderer.available:
+            return "lorenzi"
+        return renderer
+
+    @staticmethod
+    def get_cached_table_image(renderer, table_text):
+        table_image = table_image_cache.get(table_image_cache.make_key(renderer, table_text))
+        if table_image is None:
+            metrics.inc("table_cache_total", "miss")
+            return None
+        metrics.inc("table_cache_total", "hit")
+        return BytesIO(table_image)
+
+    async def get_table_image(self, mogi, current_race=None, renderer="lorenzi", location_id=None):
+        table_text = await self.get_table_text(mogi, current_race)
+        renderer = self.resolve_renderer(renderer)
+        table_image = self.get_cached_table_image(renderer, table_text)
+        if table_image is not None:
+            return table_image
+        return await self.render_table_image(renderer, table_text, location_id)
+
+    async def render_table_image(self, renderer, table_text, location_id=None):
+        # the caller already counted its lookup, an earlier render may have cached the table since
+        cache_key = table_image_cache.make_key(renderer, table_text)
+        table_image = table_image_cache.peek(cache_key)
+        if table_image is not None:
+            return BytesIO(table_image)
+        with metrics.timer("table_image_seconds", renderer):
+            if renderer == "local":
+                table_bytes = await table_renderer.render(table_text)
+            else:
+                encoded_table_text = urllib.parse.quote(table_text)
+                link = table_client.base_url + encoded_table_text
+                table_bytes = await table_client.fetch(link)
+        table_image_cache.put(cache_key, table_bytes.getvalue(), location_id)
         return table_bytes
 
+    async def get_scheduled_table_image(self, mogi, current_race=None, renderer="lorenzi", location_id=None):
+        if location_id is None:
+            return await self.get_table_image(mogi, current_race, renderer)
+        # a cached table needs no render, so it skips the scheduler
+        table_text = await self.get_table_text(mogi, current_race)
+        renderer = self.resolve_renderer(renderer)
+        table_image = self.get_cached_table_image(renderer, table_text)
+        if table_image is not None:
+            return table_image
+
+        async def render():
+            table_data = await self.render_table_image(renderer, table_text, location_id)
+            return table_data.getvalue()
+
+        return BytesIO(await render_scheduler.render(location_id, render))
+
+    async def send_standings(self, interaction, location_id, mogi, message, current_race=None):
+        server_id = str(interaction.guild_id)
+        renderer = await self.get_table_renderer(server_id)
+        if await self.get_standings_mode(server_id) == "live":
+            # the message was already part of the response, the table goes to the pinned message
+            if current_race is None:
+                current_race = await self.get_current_race(mogi)
+            table_data = await self.get_scheduled_table_image(mogi, current_race, renderer, location_id)
+            live_standings.update(location_id, interaction.channel, f"Standings after race {current_race + 1}",
+                                  table_data.getvalue(), mogi.standings_message_id)
+            return
+        async with interaction.channel.typing():
+            table_data = await self.get_scheduled_table_image(mogi, current_race, renderer, location_id)
+            image_file = discord.File(table_data, "table.png")
+            return await interaction.followup.send(message, file=image_file)
+
     @staticmethod
-    async def set_race(location_id, new_race):
-        current_data = await open_current_data()
-        current_data["current_locations"][location_id]["current_race"] = new_race
-        await update_current_data(current_data)
+    async def set_race(mogi, new_race):
+        mogi.current_race = new_race
 
     @staticmethod
     async def check_for_mod_permission(interaction, user):
@@ -76,16 +189,13 @@ class BotCommands(commands.Cog):
 
     @staticmethod
     async def check_for_valid_user(server_id, user):
-        current_data = await open_current_data()
-        invalid_users = current_data["servers"][server_id]["restricted_users"]
-        if user.id in invalid_users:
+        if state_store.is_restricted(server_id, user.id):
             return False
         return True
 
     @staticmethod
     async def check_if_mogi_is_currently_going(location_id):
-        current_data = await open_current_data()
-        return current_data["current_locations"].get(location_id) is not None
+        return state_store.current_locations.get(location_id) is not None
 
     @staticmethod
     async def check_format(format):
@@ -100,101 +210,86 @@ class BotCommands(commands.Cog):
         tags = tags_string.split(" ")
         if len(tags) != amount_of_tags:
             return "The amount of tags doesnt fit with the format!"
-        if len(set(tags)) != amount_of_tags:
+        if len({tag.casefold() for tag in tags}) != amount_of_tags:
             return "Duplicate tags aren't allowed!"
         return True
 
     @staticmethod
     async def check_race(race):
-        check = race in range(13)
+        check = race in range(1, 13)
         if not check:
             return "Your race must be between 1 and 12"
         return True
 
-    async def check_for_correct_tag(self, tag, location_id):
-        current_data = await open_current_data()
-        all_tags = []
-        for team_nr in range(await self.convert_format_to_amount_of_teams(current_data["current_locations"][location_id]["format"])):
-            all_tags.append(current_data["current_locations"][location_id]["teams"][f"team{team_nr}"]["tag"])
-        if tag in all_tags:
+    @staticmethod
+    async def check_for_correct_tag(tag, mogi):
+        if mogi.team_index(tag) is not None:
             return True
         return "There is no team with this tag in the mogi! You can use the command `/edit_tag` to change a tag"
 
     @staticmethod
-    async def check_for_correct_spots(spots, location_id):
-        current_data = await open_current_data()
-        format = current_data["current_locations"][location_id]["format"]
+    async def check_for_correct_spots(spots, mogi):
+        format = mogi.format
         spots_lst = spots.split(" ")
-        if len(spots_lst) == format:
-            return True
-        return "The amount of spots don't match with the format!"
+        if len(spots_lst) != format:
+            return "The amount of spots don't match with the format!"
+        if not all(spot.isdigit() and 1 <= int(spot) <= 12 for spot in spots_lst):
+            return "Spots must be numbers between 1 and 12!"
+        return True
+
+    async def check_race_results(self, races, mogi, first_race):
+        if len(races) == 0:
+            return "You didn't enter any results! Use the format `A 1 2, B 3 4, ...` and separate races with `;`"
+        if first_race + len(races) > 12:
+            return "A mogi only has 12 races!"
+        for race, entries in enumerate(races, first_race + 1):
+            tags = []
+            for tag, spots in entries:
+                tag_check = await self.check_for_correct_tag(tag, mogi)
+                if tag_check is not True:
+                    return f"Race {race}, `{tag}`: {tag_check}"
+                spots_check = await self.check_for_correct_spots(" ".join(spots), mogi)
+                if spots_check is not True:
+                    return f"Race {race}, `{tag}`: {spots_check}"
+                tags.append(tag)
+            if len({tag.casefold() for tag in tags}) != len(tags):
+                return f"Race {race}: A team was entered more than once!"
+            if len(tags) < mogi.amount_of_teams - 1:
+                return f"Race {race}: Please enter the spots of at least {mogi.amount_of_teams - 1} teams!"
+        return True
 
     @staticmethod
-    async def check_for_amount_of_entered_spots(location_id, current_race=None):
-        current_data = await open_current_data()
+    async def check_for_amount_of_entered_spots(mogi, current_race=None):
         if current_race is None:
-            current_race = current_data["current_locations"][location_id]["current_race"]
-        race_scores = current_data["current_locations"][location_id]["races"][f"race{current_race}"]
-        entered_spots = 0
-        for scores in race_scores.values():
-            if len(scores) != 0:
-                entered_spots += 1
-        return entered_spots
+            current_race = mogi.current_race
+        return mogi.validator.amount_entered(current_race)
 
     @staticmethod
-    async def check_for_teams_missing(location_id, current_race=None):
-        current_data = await open_current_data()
+    async def check_for_teams_missing(mogi, current_race=None):
         if current_race is None:
-            current_race = current_data["current_locations"][location_id]["current_race"]
-        race_scores = current_data["current_locations"][location_id]["races"][f"race{current_race}"]
-        missing_teams = []
-        for team, scores in race_scores.items():
-            if len(scores) == 0:
-                missing_teams.append(team)
+            current_race = mogi.current_race
         missing_tags = []
-        for team in missing_teams:
-            missing_tags.append(current_data["current_locations"][location_id]["teams"][team]["tag"])
+        for team, tag in enumerate(mogi.tags):
+            if not mogi.has_spots(current_race, team):
+                missing_tags.append(tag)
         return missing_tags
 
     @staticmethod
-    async def check_for_human_spot_errors(location_id):
-        current_data = await open_current_data()
-        races = current_data["current_locations"][location_id]["races"]
-        all_errors = {}
-        for race in races:
-            all_spots = []
-            for team in races[race]:
-                all_spots.extend(races[race][team])
-            if len(all_spots) == 0:
-                continue
-            all_errors[race] = {"missing_spots": [], "duplicate_spots": set()}
-            for spot in range(1, 13):
-                if spot not in all_spots:
-                    all_errors[race]["missing_spots"].append(spot)
-            duplicates = [spot for spot in all_spots if all_spots.count(spot) > 1]
-            all_errors[race]["duplicate_spots"].update(duplicates)
-            if len(all_errors[race]["missing_spots"]) == 0:
-                del all_errors[race]
-        if len(all_errors) != 0:
-            return all_errors
+    async def check_for_human_spot_errors(mogi):
+        races_with_errors = mogi.validator.races_with_errors()
+        if len(races_with_errors) != 0:
+            return races_with_errors
         return False
 
-    async def check_for_spots_already_entered(self, location_id, team, race=None):
-        current_data = await open_current_data()
+    @staticmethod
+    async def check_for_spots_already_entered(mogi, tag, race=None):
         if race is None:
-            race = current_data["current_locations"][location_id]["current_race"]
-        team = await self.convert_tag_to_team_number(location_id, team)
-        if len(current_data["current_locations"][location_id]["races"][f"race{race}"][f"team{team}"]) == 0:
-            return False
-        return True
+            race = mogi.current_race
+        return mogi.has_spots(race, mogi.team_index(tag))
 
     @staticmethod
-    async def check_if_tag_exists(location_id, tag):
-        current_data = await open_current_data()
-        for team in current_data["current_locations"][location_id]["teams"]:
-            if current_data["current_locations"][location_id]["teams"][team]["tag"] == tag:
-                return True
-        return False
+    async def check_if_tag_exists(mogi, tag):
+        return mogi.team_index(tag) is not None
 
     @staticmethod
     async def convert_format_to_amount_of_teams(format):
@@ -205,117 +300,79 @@ class BotCommands(commands.Cog):
         }
         return convertion[str(format)]
 
+    @staticmethod
+    async def convert_race_results(results, format):
+        # "A 1 2, B 3 4, C 5 6; A 7 8, ..." -> one list of (tag, spots) per race
+        races = []
+        for race_results in results.replace("\n", ";").split(";"):
+            words = race_results.replace(",", " ").split()
+            if len(words) != 0:
+                races.append([(words[index], words[index + 1:index + 1 + format]) for index in range(0, len(words), format + 1)])
+        return races
+
     @staticmethod
     async def convert_spot_to_points(spot):
-        spot_to_points = {
-            1: 15,
-            2: 12,
-            3: 10,
-            4: 9,
-            5: 8,
-            6: 7,
-            7: 6,
-            8: 5,
-            9: 4,
-            10: 3,
-            11: 2,
-            12: 1
-        }
-        return spot_to_points[spot]
-
-    @staticmethod
-    async def convert_tag_to_team_number(location_id, tag):
-        current_data = await open_current_data()
-        for number, team in enumerate(current_data["current_locations"][location_id]["teams"]):
-            if current_data["current_locations"][location_id]["teams"][team]["tag"] == tag:
-                return number
-
-    async def add_new_location_to_json(self, location_id, format, tags):
-        current_data = await open_current_data()
-        amount_of_teams = await self.convert_format_to_amount_of_teams(format)
-        current_data["current_locations"][location_id] = {"teams": {}, "races": {}, "format": format, "current_race": 0}
-        for index, tag in enumerate(tags):
-            current_data["current_locations"][location_id]["teams"][f"team{index}"] = {"tag": tag, "total_score": 0}
-        for race in range(12):
-            current_data["current_locations"][location_id]["races"][f"race{race}"] = {}
-            for team in range(amount_of_teams):
-                current_data["current_locations"][location_id]["races"][f"race{race}"][f"team{team}"] = []
-        await update_current_data(current_data)
-
-    async def enter_spots_to_data(self, location_id, tag, spots, race=None):
-        current_data = await open_current_data()
+        return SPOT_POINTS[spot]
+
+    @staticmethod
+    async def convert_tag_to_team_number(mogi, tag):
+        return mogi.team_index(tag)
+
+    @staticmethod
+    async def add_new_location_to_json(location_id, format, tags):
+        async with state_store.transaction(location_id) as transaction:
+            transaction.replace(Mogi(format, tags))
+        table_image_cache.evict_location(location_id)
+
+    @staticmethod
+    async def enter_spots_to_data(mogi, tag, spots, race=None):
         if race is None:
-            race = current_data["current_locations"][location_id]["current_race"]
-        current_data["current_locations"][location_id]["races"][f"race{race}"][f"team{await self.convert_tag_to_team_number(location_id, tag)}"] = spots
-        await update_current_data(current_data)
+            race = mogi.current_race
+        mogi.set_spots(race, mogi.team_index(tag), spots)
 
     @staticmethod
-    async def automatically_enter_score_of_last_team(location_id, current_race=None):
-        current_data = await open_current_data()
-        if current_race is not None:
-            current_race = current_data["current_locations"][location_id]["current_race"]
-        current_race_scores = current_data["current_locations"][location_id]["races"][f"race{current_race}"]
-        all_entered_scores = []
+    async def automatically_enter_score_of_last_team(mogi, current_race=None):
+        if current_race is None:
+            current_race = mogi.current_race
         missing_team = None
-        for team in current_race_scores:
-            if len(current_race_scores[team]) == 0:
+        for team in range(mogi.amount_of_teams):
+            if not mogi.has_spots(current_race, team):
                 missing_team = team
-                continue
-            all_entered_scores.extend(current_race_scores[team])
-        all_supposed_scores = list(range(1, 13))
-        missing_scores = [list(set(all_supposed_scores) - set(all_entered_scores))]
-        amount_of_spots = int(12/len(current_race_scores))
-        current_data["current_locations"][location_id]["races"][f"race{current_race}"][missing_team] = missing_scores[0][:amount_of_spots]
-        await update_current_data(current_data)
-
-    async def edit_total_scores(self, location_id):
-        current_data = await open_current_data()
-        total_scores = {}
-        for team in current_data["current_locations"][location_id]["teams"]:
-            total_scores[team] = 0
-        for team in total_scores:
-            for race in current_data["current_locations"][location_id]["races"]:
-                for spot in current_data["current_locations"][location_id]["races"][race][team]:
-                    total_scores[team] += await self.convert_spot_to_points(spot)
-        for team in current_data["current_locations"][location_id]["teams"]:
-            current_data["current_locations"][location_id]["teams"][team]["total_score"] = total_scores[team]
-        await update_current_data(current_data)
-
-    @staticmethod
-    async def write_human_spot_error_message(location_id, errors):
-        current_data = await open_current_data()
+        missing_scores = mogi.validator.missing_spots(current_race)
+        mogi.set_spots(current_race, missing_team, missing_scores[:mogi.format])
+
+    @staticmethod
+    async def write_human_spot_error_message(mogi, races_with_errors):
         error_message = f"```ini\n"
         teams_with_errors = set()
-        for race in errors:
-            race_number = str(int(race[4:]) + 1)
-            error_message += f"Race {race_number}\n"
-            teams = current_data["current_locations"][location_id]["races"][race]
-            for team in teams:
+        for race in races_with_errors:
+            error_message += f"Race {race + 1}\n"
+            for team, tag in enumerate(mogi.tags):
                 team_score_message_part = ""
-                team_score_message_part += f"{current_data['current_locations'][location_id]['teams'][team]['tag']}: "
-                team_scores = current_data["current_locations"][location_id]["races"][race][team]
-                for spot in team_scores:
-                    if spot in errors[race]["duplicate_spots"]:
+                team_score_message_part += f"{tag}: "
+                for spot in mogi.team_spots(race, team):
+                    if mogi.validator.is_duplicate(race, spot):
                         spot_msg = f"[{str(spot)}]"
-                        teams_with_errors.update(current_data['current_locations'][location_id]['teams'][team]['tag'])
+                        teams_with_errors.add(tag)
                     else:
                         spot_msg = str(spot)
                     team_score_message_part += f"{spot_msg} "
                 error_message += f"{team_score_message_part}\n"
-            error_message += f"Missing spots: {', '.join([str(spot) for spot in errors[race]['missing_spots']])}\n\n"
+            error_message += f"Missing spots: {', '.join([str(spot) for spot in mogi.validator.missing_spots(race)])}\n\n"
         error_message += "```\n"
         if len(teams_with_errors) != 0:
             error_message += "Please edit your spots: " + ", ".join(list(teams_with_errors))
         return error_message
 
     @staticmethod
-    async def write_entry_error_message(errors, race):
+    async def write_entry_error_message(mogi, race):
+        duplicate_spots = mogi.validator.duplicate_spots(race)
         error_message = "The spot"
-        if len(errors[f"race{race}"]["duplicate_spots"]) != 1:
+        if len(duplicate_spots) != 1:
             error_message += "s"
         error_message += " "
-        error_message += ", ".join(str(spot) for spot in errors[f"race{race}"]["duplicate_spots"])
-        if len(errors[f"race{race}"]["duplicate_spots"]) == 1:
+        error_message += ", ".join(str(spot) for spot in duplicate_spots)
+        if len(duplicate_spots) == 1:
             error_message += " was "
         else:
             error_message += " were "
@@ -323,78 +380,131 @@ class BotCommands(commands.Cog):
         return error_message
 
     @staticmethod
-    async def change_tag(location_id, old_tag, new_tag):
-        current_data = await open_current_data()
-        for team in current_data["current_locations"][location_id]["teams"]:
-            if current_data["current_locations"][location_id]["teams"][team]["tag"] == old_tag:
-                current_data["current_locations"][location_id]["teams"][team]["tag"] = new_tag
-                break
-        await update_current_data(current_data)
-        return
-
-    async def set_race_to_default(self, location_id, race):
-        current_data = await open_current_data()
-        default_standings = {}
-        amount_of_teams = await self.convert_format_to_amount_of_teams(current_data["current_locations"][location_id]["format"])
-        for team in range(amount_of_teams):
-            default_standings[f"team{team}"] = []
-        current_data["current_locations"][location_id]["races"][f"race{race - 1}"] = default_standings
-        await update_current_data(current_data)
+    async def change_tag(mogi, old_tag, new_tag):
+        mogi.change_tag(old_tag, new_tag)
 
     @staticmethod
-    async def count_current_race_one_up(location_id):
-        current_data = await open_current_data()
-        current_data["current_locations"][location_id]["current_race"] += 1
-        await update_current_data(current_data)
+    async def set_race_to_default(mogi, race):
+        mogi.reset_race(race - 1)
 
     @staticmethod
-    async def reset_standings(location_id):
-        current_data = await open_current_data()
-        del current_data["current_locations"][location_id]
-        await update_current_data(current_data)
+    async def count_current_race_one_up(mogi):
+        mogi.current_race += 1
 
-    async def send_race_results(self, interaction, location_id, team, spots, race=None):
-        await self.enter_spots_to_data(location_id, team, spots, race)
-        teams_missing = await self.check_for_teams_missing(location_id, race)
-        amount_of_teams = await self.get_amount_of_teams(location_id)
-        if race is None:
-            race = await self.get_current_race(location_id)
-        current_race = await self.get_current_race(location_id)
-        spots_entered = await self.check_for_amount_of_entered_spots(location_id, race)  # returns the amount of teams who entered their spot
-        human_error_check = await self.check_for_human_spot_errors(location_id)
+    @staticmethod
+    async def reset_standings(transaction):
+        transaction.archive("finished")
+        table_image_cache.evict_location(transaction.location_id)
 
-        error_message = ""
-        if human_error_check is not False:
-            if human_error_check.get(f"race{race}", {}).get("duplicate_spots") is not None:
-                duplicate_spots = human_error_check.get(f"race{race}", {}).get("duplicate_spots")
-                if len(duplicate_spots) != 0 and any(spot in duplicate_spots for spot in spots):
-                    error_message = await self.write_entry_error_message(human_error_check, race)
-        await interaction.response.send_message(f"Spots **{', '.join(map(str, spots))}** entered for team **{team}**\n\n{error_message}")
+    @staticmethod
+    def vote_view(vote_id, vote, disabled=False):
+        view = discord.ui.View(timeout=None)
+        if vote.kind == "race":
+            race = vote.data[2]
+            view.add_item(VoteButton(vote_id, "current", f"Race {race + 1}", discord.ButtonStyle.green, disabled))
+            view.add_item(VoteButton(vote_id, "next", f"Race {race + 2}", discord.ButtonStyle.blurple, disabled or race == 11))
+            return view
+        yes_needed, no_needed = VOTES_NEEDED[vote.kind]
+        view.add_item(VoteButton(vote_id, "yes", f"Yes (+{max(yes_needed - len(vote.yes), 0)})", discord.ButtonStyle.green, disabled))
+        view.add_item(VoteButton(vote_id, "no", f"No (+{max(no_needed - len(vote.no), 0)})", discord.ButtonStyle.red, disabled))
+        return view
+
+    async def handle_vote(self, interaction, vote_id, choice):
+        vote = vote_registry.get(vote_id)
+        if vote is None:
+            return await interaction.response.send_message("This vote has expired!", ephemeral=True)
+        if vote.kind == "race":
+            return await self.decide_race(interaction, vote_id, vote, choice)
+        return await self.count_vote(interaction, vote_id, vote, choice)
+
+    async def decide_race(self, interaction, vote_id, vote, choice):
+        if interaction.user.id != vote.user_id:
+            return await interaction.response.send_message("You are not supposed to decide between the races here!", ephemeral=True)
+        team, spots, race = vote.data
+        await vote_registry.finish(vote_id)
+        if choice == "next":
+            async with state_store.transaction(vote.location_id) as transaction:
+                await self.count_current_race_one_up(transaction.mogi)
+        await self.send_race_results(interaction, vote.location_id, team, spots)
+        await interaction.message.edit(view=self.vote_view(vote_id, vote, disabled=True))
+
+    async def count_vote(self, interaction, vote_id, vote, choice):
+        user_id = interaction.user.id
+        messages = VOTE_MESSAGES[vote.kind]
+        if choice == "no" and user_id == vote.user_id:
+            await vote_registry.finish(vote_id)
+            return await interaction.message.delete()
+        voters, other_voters = (vote.yes, vote.no) if choice == "yes" else (vote.no, vote.yes)
+        if user_id in voters or choice == "yes" and user_id == vote.user_id:
+            return await interaction.response.send_message(messages[f"already_{choice}"], ephemeral=True)
+        voters.add(user_id)
+        other_voters.discard(user_id)
+        yes_needed, no_needed = VOTES_NEEDED[vote.kind]
+        passed = len(vote.yes) >= yes_needed
+        rejected = len(vote.no) >= no_needed
+        if passed or rejected:
+            await vote_registry.finish(vote_id)
+        else:
+            await vote_registry.save()
+        await interaction.message.edit(content=interaction.message.content, view=self.vote_view(vote_id, vote, disabled=passed or rejected))
+        if passed:
+            return await interaction.response.send_message(await self.apply_vote(vote))
+        if rejected:
+            return await interaction.response.send_message(messages["rejected"])
+        await interaction.response.send_message(messages[choice], ephemeral=True)
+
+    async def apply_vote(self, vote):
+        if vote.kind == "revert":
+            race = vote.data[0]
+            async with state_store.transaction(vote.location_id) as transaction:
+                if transaction.mogi is not None:
+                    await self.set_race_to_default(transaction.mogi, race)
+                    await self.set_race(transaction.mogi, race)
+            table_image_cache.evict_location(vote.location_id)
+            return f"Race {race} was voted to be reverted. The current race is {race}\nUse `/undo` to bring it back."
+        format, tags = vote.data
+        await self.add_new_location_to_json(vote.location_id, format, tags)
+        return "The mogi-standings were voted to be restarted!"
 
-        async with interaction.channel.typing():
-            print(amount_of_teams, spots_entered)
-            if amount_of_teams - 1 == spots_entered and len(human_error_check.get(f"race{race}", {}).get("duplicate_spots", set())) == 0:
-                await self.automatically_enter_score_of_last_team(location_id, race)
+    async def send_race_results(self, interaction, location_id, team, spots, race=None):
+        async with state_store.transaction(location_id) as transaction:
+            mogi = transaction.mogi
+            current_race = await self.get_current_race(mogi)
+            if race is None:
+                race = current_race
+            await self.enter_spots_to_data(mogi, team, spots, race)
+            teams_missing = await self.check_for_teams_missing(mogi, race)
+            amount_of_teams = await self.get_amount_of_teams(mogi)
+            spots_entered = await self.check_for_amount_of_entered_spots(mogi, race)  # returns the amount of teams who entered their spot
+
+            error_message = ""
+            if any(mogi.validator.is_duplicate(race, spot) for spot in spots):
+                error_message = await self.write_entry_error_message(mogi, race)
+
+            if amount_of_teams - 1 == spots_entered and not mogi.validator.has_duplicates(race):
+                await self.automatically_enter_score_of_last_team(mogi, race)
                 message = f"Standings after race {race + 1}"
                 if race == current_race and race != 11:
-                    await self.count_current_race_one_up(location_id)
+                    await self.count_current_race_one_up(mogi)
             elif amount_of_teams == spots_entered:
                 message = f"Standings after race {race + 1}"
                 if race == current_race and race != 11:
-                    await self.count_current_race_one_up(location_id)
+                    await self.count_current_race_one_up(mogi)
             else:
                 teams_missing_str = ", ".join([f"{team}" for team in teams_missing])
                 team_plural = "s" if len(teams_missing) > 1 else ""
                 message = f"For __race {race + 1}__, {len(teams_missing)} team{team_plural} missing!\nPlease enter your spot{team_plural}: **{teams_missing_str}**\n\n"
-            await self.edit_total_scores(location_id)
-            table_data = await self.get_table_image(location_id, current_race)
-            image_file = discord.File(table_data, "table.png")
-            human_error_check = await self.check_for_human_spot_errors(location_id)
+            human_error_check = await self.check_for_human_spot_errors(mogi)
             if human_error_check is not False:
-                message += await self.write_human_spot_error_message(location_id, human_error_check)
+                message += await self.write_human_spot_error_message(mogi, human_error_check)
             if human_error_check is False and current_race == 11:
-                await self.reset_standings(location_id)
-            return await interaction.followup.send(message, file=image_file)
+                await self.reset_standings(transaction)
+
+        response = f"Spots **{', '.join(map(str, spots))}** entered for team **{team}**\n\n{error_message}"
+        if await self.get_standings_mode(str(interaction.guild_id)) == "live":
+            response += f"\n{message}"
+        await interaction.response.send_message(response)
+        return await self.send_standings(interaction, location_id, mogi, message, current_race)
 
 
     @app_commands.command(name="explain")
@@ -414,73 +524,188 @@ class BotCommands(commands.Cog):
             return await interaction.response.send_message(tags_check, ephemeral=True)
         location_id = await self.get_location_id(interaction)
         currently_going_check = await self.check_if_mogi_is_currently_going(location_id)
-        menu = ConfirmationMenu2(interaction.user.id, location_id, format, tags.split(" "))
         if currently_going_check is True:
-            return await interaction.response.send_message("There is a mogi currrently running. Do you want to create a new mogi-standings?", view=menu)
+            vote_id = await vote_registry.create("restart", location_id, interaction.user.id, [format, tags.split(" ")], yes=[interaction.user.id])
+            view = self.vote_view(vote_id, vote_registry.get(vote_id))
+            return await interaction.response.send_message("There is a mogi currrently running. Do you want to create a new mogi-standings?", view=view)
         await self.add_new_location_to_json(location_id, format, tags.split(" "))
         return await interaction.response.send_message("Mogi standings started! Use `/spots` to enter spots to the standings!")
 
+    async def tag_autocomplete(self, interaction: discord.Interaction, current: str):
+        # runs on every keystroke, only the in-memory tag index is used once the guild is loaded
+        await state_store.load_guild(str(interaction.guild_id))
+        mogi = state_store.current_locations.get(await self.get_location_id(interaction))
+        if mogi is None:
+            return []
+        return [app_commands.Choice(name=tag, value=tag) for tag in mogi.tags_starting_with(current)]
+
     @app_commands.command(name="spots")
+    @app_commands.autocomplete(tag=tag_autocomplete)
     async def spots(self, interaction: discord.Interaction, tag: str, spots: str):
         location_id = await self.get_location_id(interaction)
         if await self.check_for_valid_user(str(interaction.guild_id), interaction.user) is not True:
             return await interaction.response.send_message("You are restricted from using commands of this bot!", ephemeral=True)
-        tag_check = await self.check_for_correct_tag(tag, location_id)
+        mogi = await self.get_mogi(location_id)
+        tag_check = await self.check_for_correct_tag(tag, mogi)
         if tag_check is not True:
             return await interaction.response.send_message(tag_check, ephemeral=True)
-        spots_check = await self.check_for_correct_spots(spots, location_id)
+        tag = mogi.team_tag(tag)
+        spots_check = await self.check_for_correct_spots(spots, mogi)
         if spots_check is not True:
             return await interaction.response.send_message(spots_check)
         spots = list(map(lambda spot: int(spot), spots.split(" ")))
-        if await self.check_for_spots_already_entered(location_id, tag):
-            race = await self.get_current_race(location_id)
-            menu = DecideRaceMenu(interaction, interaction.user.id, location_id, tag, spots, race)
+        if await self.check_for_spots_already_entered(mogi, tag):
+            race = await self.get_current_race(mogi)
+            vote_id = await vote_registry.create("race", location_id, interaction.user.id, [tag, spots, race])
+            view = self.vote_view(vote_id, vote_registry.get(vote_id))
             await interaction.response.send_message(f"This team has already an entered spot for **race {race + 1}**. Do you want to edit your spots for **race {race + 1}** or enter the spots for race **{race + 2}**",
-                                                    view=menu)
+                                                    view=view)
             return
         await self.send_race_results(interaction, location_id, tag, spots)
         return
 
     @app_commands.command(name="edit_spots")
+    @app_commands.autocomplete(tag=tag_autocomplete)
     async def edit_spots(self, interaction: discord.Interaction, tag: str, new_spots: str, race: int):
         location_id = await self.get_location_id(interaction)
         if await self.check_for_valid_user(str(interaction.guild_id), interaction.user) is not True:
             return await interaction.response.send_message("You are restricted from using commands of this bot!", ephemeral=True)
-        tag_check = await self.check_for_correct_tag(tag, location_id)
+        mogi = await self.get_mogi(location_id)
+        tag_check = await self.check_for_correct_tag(tag, mogi)
         if tag_check is not True:
             return await interaction.response.send_message(tag_check, ephemeral=True)
+        tag = mogi.team_tag(tag)
         race_check = await self.check_race(race)
         if race_check is not True:
             return await interaction.response.send_message(race_check, ephemeral=True)
-        spots_check = await self.check_for_correct_spots(new_spots, location_id)
+        spots_check = await self.check_for_correct_spots(new_spots, mogi)
         if spots_check is not True:
             return await interaction.response.send_message(spots_check)
         spots = list(map(lambda spot: int(spot), new_spots.split(" ")))
         await self.send_race_results(interaction, location_id, tag, spots, race - 1)
         return
 
+    @app_commands.command(name="race_results")
+    @app_commands.describe(results="Spots of every team, e.g. `A 1 2, B 3 4, C 5 6, D 7 8, E 9 10`. Separate races with `;`",
+                           race="The first race of the results, the current race by default")
+    async def race_results(self, interaction: discord.Interaction, results: str, race: int = None):
+        location_id = await self.get_location_id(interaction)
+        if await self.check_for_valid_user(str(interaction.guild_id), interaction.user) is not True:
+            return await interaction.response.send_message("You are restricted from using commands of this bot!", ephemeral=True)
+        if race is not None:
+            race_check = await self.check_race(race)
+            if race_check is not True:
+                return await interaction.response.send_message(race_check, ephemeral=True)
+        if not await self.check_if_mogi_is_currently_going(location_id):
+            return await interaction.response.send_message("There is no mogi running in this channel! Use `/start` to start one", ephemeral=True)
+        async with state_store.transaction(location_id) as transaction:
+            current_race = await self.get_current_race(transaction.mogi)
+            first_race = current_race if race is None else race - 1
+            races = await self.convert_race_results(results, transaction.mogi.format)
+            results_check = await self.check_race_results(races, transaction.mogi, first_race)
+            # everything is entered into a copy, so a single bad race leaves the standings untouched
+            mogi = transaction.mogi.copy()
+            last_race = first_race + len(races) - 1
+            for race, entries in enumerate(races, first_race):
+                if results_check is not True:
+                    break
+                mogi.reset_race(race)
+                for tag, spots in entries:
+                    await self.enter_spots_to_data(mogi, tag, list(map(int, spots)), race)
+                spots_entered = await self.check_for_amount_of_entered_spots(mogi, race)
+                if mogi.amount_of_teams - 1 == spots_entered and not mogi.validator.has_duplicates(race):
+                    await self.automatically_enter_score_of_last_team(mogi, race)
+                if mogi.validator.has_duplicates(race):
+                    results_check = f"Race {race + 1}: " + await self.write_entry_error_message(mogi, race)
+                elif not mogi.validator.is_complete(race):
+                    missing_spots = ", ".join(map(str, mogi.validator.missing_spots(race)))
+                    results_check = f"Race {race + 1}: The spots {missing_spots} are missing!"
+            if results_check is True:
+                transaction.mogi = mogi
+                if first_race <= current_race <= last_race:
+                    await self.set_race(mogi, min(last_race + 1, 11))
+                message = f"Standings after race {last_race + 1}"
+                human_error_check = await self.check_for_human_spot_errors(mogi)
+                if human_error_check is not False:
+                    message += await self.write_human_spot_error_message(mogi, human_error_check)
+                elif last_race == 11 and mogi.current_race == 11:
+                    await self.reset_standings(transaction)
+        if results_check is not True:
+            return await interaction.response.send_message(results_check, ephemeral=True)
+
+        race_numbers = ", ".join(str(race + 1) for race in range(first_race, last_race + 1))
+        response = f"Results entered for race{'s' if len(races) > 1 else ''} **{race_numbers}**"
+        if await self.get_standings_mode(str(interaction.guild_id)) == "live":
+            response += f"\n{message}"
+        await interaction.response.send_message(response)
+        return await self.send_standings(interaction, location_id, mogi, message, last_race)
+
     @app_commands.command(name="edit_tag")
     async def edit_tag(self, interaction: discord.Interaction, old_tag: str, new_tag: str):
         location_id = await self.get_location_id(interaction)
         if await self.check_for_valid_user(str(interaction.guild_id), interaction.user) is not True:
             return await interaction.response.send_message("You are restricted from using commands of this bot!", ephemeral=True)
-        old_tag_check = await self.check_if_tag_exists(location_id, old_tag)
-        if old_tag_check is not True:
-            return await interaction.response.send_message("This tag doesn't exist and therefore cant be edited!")
-        new_tag_check = await self.check_if_tag_exists(location_id, new_tag)
-        if new_tag_check:
-            return await interaction.response.send_message("An other team already uses this tag!")
-        await self.change_tag(location_id, old_tag, new_tag)
-        await interaction.response.send_message(f"Tag changed from `{old_tag}` to `{new_tag}`")
+        async with state_store.transaction(location_id) as transaction:
+            old_tag_check = await self.check_if_tag_exists(transaction.mogi, old_tag)
+            new_tag_check = await self.check_if_tag_exists(transaction.mogi, new_tag)
+            if old_tag_check is not True:
+                message = "This tag doesn't exist and therefore cant be edited!"
+            elif new_tag_check and transaction.mogi.team_index(new_tag) != transaction.mogi.team_index(old_tag):
+                message = "An other team already uses this tag!"
+            else:
+                await self.change_tag(transaction.mogi, old_tag, new_tag)
+                message = f"Tag changed from `{old_tag}` to `{new_tag}`"
+        await interaction.response.send_message(message)
 
     @app_commands.command(name="revert_race")
     async def revert_race(self, interaction: discord.Interaction, race: int):
         location_id = await self.get_location_id(interaction)
         if await self.check_for_valid_user(str(interaction.guild_id), interaction.user) is not True:
             return await interaction.response.send_message("You are restricted from using commands of this bot!", ephemeral=True)
-        view = ConfirmationMenu(interaction.user.id, location_id, race)
+        race_check = await self.check_race(race)
+        if race_check is not True:
+            return await interaction.response.send_message(race_check, ephemeral=True)
+        vote_id = await vote_registry.create("revert", location_id, interaction.user.id, [race], yes=[interaction.user.id])
+        view = self.vote_view(vote_id, vote_registry.get(vote_id))
         await interaction.response.send_message(f"Do you want to revert race {race}? 2 confirmations needed", view=view)
 
+    @app_commands.command(name="undo")
+    async def undo(self, interaction: discord.Interaction):
+        location_id = await self.get_location_id(interaction)
+        if await self.check_for_valid_user(str(interaction.guild_id), interaction.user) is not True:
+            return await interaction.response.send_message("You are restricted from using commands of this bot!", ephemeral=True)
+        async with state_store.transaction(location_id) as transaction:
+            undone = state_store.undo(transaction)
+        if not undone:
+            return await interaction.response.send_message("There is nothing to undo in this channel!", ephemeral=True)
+        mogi = transaction.mogi
+        if mogi is None:
+            return await interaction.response.send_message("The last change was undone! There are no mogi standings in this channel anymore.")
+        await interaction.response.send_message("The last change was undone!")
+        race = await self.get_current_race(mogi)
+        return await self.send_standings(interaction, location_id, mogi, f"Standings after race {race + 1}")
+
+    @app_commands.command(name="restore_mogi")
+    async def restore_mogi(self, interaction: discord.Interaction):
+        location_id = await self.get_location_id(interaction)
+        if await self.check_for_valid_user(str(interaction.guild_id), interaction.user) is not True:
+            return await interaction.response.send_message("You are restricted from using commands of this bot!", ephemeral=True)
+        if state_store.archive is None:
+            return await interaction.response.send_message("Archiving is disabled on this bot!", ephemeral=True)
+        async with state_store.transaction(location_id) as transaction:
+            if transaction.mogi is not None:
+                return await interaction.response.send_message("There is a mogi currently running in this channel!", ephemeral=True)
+            archived = state_store.archive.latest(location_id)
+            if archived is None:
+                return await interaction.response.send_message("There is no archived mogi in this channel!", ephemeral=True)
+            archive_id, archived_at, reason, mogi = archived
+            transaction.restore(archive_id, reason, mogi)
+        metrics.inc("mogis_restored_total")
+        table_image_cache.evict_location(location_id)
+        await interaction.response.send_message(f"The mogi archived <t:{int(archived_at)}:R> was restored!")
+        race = await self.get_current_race(mogi)
+        return await self.send_standings(interaction, location_id, mogi, f"Standings after race {race + 1}")
+
     @app_commands.command(name="set_current_race")
     async def set_current_race(self, interaction: discord.Interaction, new_race: int):
         if await self.check_for_valid_user(str(interaction.guild_id), interaction.user) is not True:
@@ -489,37 +714,76 @@ class BotCommands(commands.Cog):
         if race_check is not True:
             return await interaction.response.send_message(race_check, ephemeral=True)
         location_id = await self.get_location_id(interaction)
-        await self.set_race(location_id, new_race - 1)
+        async with state_store.transaction(location_id) as transaction:
+            await self.set_race(transaction.mogi, new_race - 1)
         return await interaction.response.send_message(f"The current race is set to {new_race}")
 
     @app_commands.command(name="show_standings")
     async def show_standings(self, interaction: discord.Interaction):
         location_id = await self.get_location_id(interaction)
-        await self.edit_total_scores(location_id)
-        table_data = await self.get_table_image(location_id)
-        image_file = discord.File(table_data, "table.png")
-        race = await self.get_current_race(location_id)
-        human_error_check = await self.check_for_human_spot_errors(location_id)
+        mogi = await self.get_mogi(location_id)
+        renderer = await self.get_table_renderer(str(interaction.guild_id))
+        race = await self.get_current_race(mogi)
+        human_error_check = await self.check_for_human_spot_errors(mogi)
         error_message = ""
         if human_error_check is not False:
-            error_message = await self.write_human_spot_error_message(location_id, human_error_check)
+            error_message = await self.write_human_spot_error_message(mogi, human_error_check)
+        if await self.get_standings_mode(str(interaction.guild_id)) == "live":
+            await interaction.response.send_message(f"Standings after race {race + 1}{error_message}\nThe standings are kept up to date in the pinned message")
+            table_data = await self.get_scheduled_table_image(mogi, renderer=renderer, location_id=location_id)
+            live_standings.update(location_id, interaction.channel, f"Standings after race {race + 1}", table_data.getvalue(), mogi.standings_message_id)
+            return
+        table_data = await self.get_scheduled_table_image(mogi, renderer=renderer, location_id=location_id)
+        image_file = discord.File(table_data, "table.png")
         return await interaction.response.send_message(f"Standings after race {race + 1}{error_message}", file=image_file)
         pass
 
+    @app_commands.command(name="tag_stats")
+    async def tag_stats(self, interaction: discord.Interaction, tag: str):
+        if state_store.archive is None:
+            return await interaction.response.send_message("Archiving is disabled on this bot!", ephemeral=True)
+        stats = state_store.archive.tag_stats(str(interaction.guild_id), tag)
+        if stats is None:
+            return await interaction.response.send_message(f"There are no finished mogis of **{tag}** in this server!", ephemeral=True)
+        return await interaction.response.send_message(
+            f"**{tag}** in {stats['mogis']} finished mogis\n"
+            f"Average score: **{stats['average_score']:.1f}**\n"
+            f"Average placement: **{stats['average_placement']:.2f}**\n"
+            f"Mogis won: **{stats['mogi_wins']}**\n"
+            f"Race win rate: **{stats['race_win_rate']:.1%}**"
+        )
+
+    @app_commands.command(name="head_to_head")
+    async def head_to_head(self, interaction: discord.Interaction, tag: str):
+        if state_store.archive is None:
+            return await interaction.response.send_message("Archiving is disabled on this bot!", ephemeral=True)
+        records = state_store.archive.head_to_head(str(interaction.guild_id), tag)
+        if len(records) == 0:
+            return await interaction.response.send_message(f"There are no finished mogis of **{tag}** in this server!", ephemeral=True)
+        lines = [f"{opponent}: {wins}W {losses}L {ties}T ({differential:+.1f} per mogi)" for opponent, wins, losses, ties, differential in records]
+        return await interaction.response.send_message(f"Head to head records of **{tag}**\n```\n" + "\n".join(lines) + "\n```")
+
+    @app_commands.command(name="guild_stats")
+    async def guild_stats(self, interaction: discord.Interaction):
+        if state_store.archive is None:
+            return await interaction.response.send_message("Archiving is disabled on this bot!", ephemeral=True)
+        mogis, tags = state_store.archive.guild_stats(str(interaction.guild_id))
+        if mogis == 0:
+            return await interaction.response.send_message("There are no finished mogis in this server!", ephemeral=True)
+        lines = [
+            f"{tag}: {amount} mogis, {average_score:.1f} avg score, {average_placement:.2f} avg placement, {race_win_rate:.1%} races won"
+            for tag, amount, average_score, average_placement, race_win_rate in tags
+        ]
+        return await interaction.response.send_message(f"**{mogis}** finished mogis in this server\n```\n" + "\n".join(lines) + "\n```")
+
     @app_commands.command(name="z_restrict_user")
     async def z_restrict_user(self, interaction: discord.Interaction, user: discord.User):
         server_id = interaction.guild_id
         mod_check = await self.check_for_mod_permission(interaction, interaction.user)
         if mod_check is not True:
             return await interaction.response.send_message(mod_check, ephemeral=True)
-        current_data = await open_current_data()
-        invalid_users = current_data["servers"][str(server_id)]["restricted_users"]
-        if user.id not in invalid_users:
-            invalid_users.append(user.id)
-        else:
+        if not state_store.set_restricted(str(server_id), user.id, True):
             return await interaction.response.send_message("This user is already restricted from using any commands of this bot!", ephemeral=True)
-        current_data["servers"][str(server_id)]["restricted_users"] = invalid_users
-        await update_current_data(current_data)
         return await interaction.response.send_message(f"Done! {user.display_name} isn't allowed to use commands of this bot anymore!", ephemeral=True)
 
     @app_commands.command(name="z_unrestrict_user")
@@ -528,169 +792,53 @@ class BotCommands(commands.Cog):
         mod_check = await self.check_for_mod_permission(interaction, interaction.user)
         if mod_check is not True:
             return await interaction.response.send_message(mod_check, ephemeral=True)
-        current_data = await open_current_data()
-        invalid_users = current_data["servers"][str(server_id)]["restricted_users"]
-        if user.id in invalid_users:
-            invalid_users.remove(user.id)
-        else:
+        if not state_store.set_restricted(str(server_id), user.id, False):
             return await interaction.response.send_message(
                 "This user isn't restricted from using any commands of this bot!", ephemeral=True)
-        current_data["servers"][str(server_id)]["restricted_users"] = invalid_users
-        await update_current_data(current_data)
         return await interaction.response.send_message(
             f"Done! {user.display_name} is allowed to use commands of this bot again!", ephemeral=True)
 
-class DecideRaceMenu(discord.ui.View, BotCommands):
-    def __init__(self, original_interaction, command_user_id, location_id, team, spots, race):
-        super().__init__()
-        self.value = None
-        self.original_interaction = original_interaction
-        self.command_user_id = command_user_id
-        self.location_id = location_id
-        self.team = team
-        self.spots = spots
-        self.race = race
-
-        self.button_current_race.label = f"Race {self.race + 1}"
-        self.button_next_race.label = f"Race {self.race + 2}"
-
-        if race == 11:
-            self.button_next_race.disabled = True
-
-
-    async def disable_all_buttons(self, interaction):
-        for button in self.children:
-            button.disabled = True
-        await interaction.message.edit(view=self)
+    @app_commands.command(name="z_set_table_renderer")
+    async def z_set_table_renderer(self, interaction: discord.Interaction, renderer: Literal["lorenzi", "local"]):
+        server_id = interaction.guild_id
+        mod_check = await self.check_for_mod_permission(interaction, interaction.user)
+        if mod_check is not True:
+            return await interaction.response.send_message(mod_check, ephemeral=True)
+        if renderer == "local" and not table_renderer.available:
+            return await interaction.response.send_message("The local table renderer isn't available on this bot!", ephemeral=True)
+        state_store.server(str(server_id))["table_renderer"] = renderer
+        state_store.mark_dirty(server_id=str(server_id))
+        return await interaction.response.send_message(f"Done! Standings tables are now rendered by `{renderer}`!", ephemeral=True)
+
+    @app_commands.command(name="z_set_standings_mode")
+    async def z_set_standings_mode(self, interaction: discord.Interaction, mode: Literal["upload", "live"]):
+        server_id = interaction.guild_id
+        mod_check = await self.check_for_mod_permission(interaction, interaction.user)
+        if mod_check is not True:
+            return await interaction.response.send_message(mod_check, ephemeral=True)
+        state_store.server(str(server_id))["standings_mode"] = mode
+        state_store.mark_dirty(server_id=str(server_id))
+        if mode == "live":
+            return await interaction.response.send_message("Done! Every mogi now keeps one pinned standings message up to date!", ephemeral=True)
+        return await interaction.response.send_message("Done! The standings are now posted as a new message after every entry!", ephemeral=True)
 
-    @discord.ui.button(label=f"Race", style=discord.ButtonStyle.green)
-    async def button_current_race(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if interaction.user.id != self.command_user_id:
-            return await interaction.response.send_message("You are not supposed to decide between the races here!", ephemeral=True)
-        await self.send_race_results(interaction, self.location_id, self.team, self.spots)
-        await self.disable_all_buttons(interaction)
-        return
+class VoteButton(discord.ui.DynamicItem[discord.ui.Button], template=r"vote:(?P<vote_id>[\w-]+):(?P<choice>[a-z]+)"):
+    # the vote lives in the registry, so the button works from its custom_id alone, even after a restart
+    def __init__(self, vote_id, choice, label=None, style=discord.ButtonStyle.grey, disabled=False):
+        super().__init__(discord.ui.Button(label=label, style=style, disabled=disabled, custom_id=f"vote:{vote_id}:{choice}"))
+        self.vote_id = vote_id
+        self.choice = choice
 
-    @discord.ui.button(label=f"Race", style=discord.ButtonStyle.blurple)
-    async def button_next_race(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if interaction.user.id != self.command_user_id:
-            return await interaction.response.send_message("You are not supposed to decide between the races here!", ephemeral=True)
-        await self.count_current_race_one_up(self.location_id)
-        await self.send_race_results(interaction, self.location_id, self.team, self.spots)
-        await self.disable_all_buttons(interaction)
-        return
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(match["vote_id"], match["choice"], item.label, item.style)
 
-    # TODO cancel button
-
-class ConfirmationMenu(discord.ui.View, BotCommands):
-    def __init__(self, command_user_id, location_id, race):
-        super().__init__()
-        self.value = None
-        self.command_user_id = command_user_id
-        self.location_id = location_id
-        self.race = race
-        self.voters_yes = []
-        self.voters_no = []
-
-        self.confirmations_needed_yes = 3
-        self.confirmations_needed_no = 2
-
-        self.voters_yes.append(self.command_user_id)
-
-    async def disable_all_buttons(self, interaction):
-        for button in self.children:
-            button.disabled = True
-        await interaction.message.edit(view=self)
-
-    @discord.ui.button(label="Yes (+2)", style=discord.ButtonStyle.green)
-    async def button_yes(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if interaction.user.id == self.command_user_id or interaction.user.id in self.voters_yes:
-            return await interaction.response.send_message("You have already voted to revert the race!", ephemeral=True)
-        self.voters_yes.append(interaction.user.id)
-        if self.confirmations_needed_yes <= len(self.voters_yes):
-            await self.disable_all_buttons(interaction)
-            await self.set_race_to_default(self.location_id, self.race)
-            await self.set_race(self.location_id, self.race)
-            button.label = f"{button.label[:-2]}{self.confirmations_needed_yes - len(self.voters_yes)}{button.label[-1]}"
-            await interaction.message.edit(content=interaction.message.content, view=self)
-            return await interaction.response.send_message(f"Race {self.race} was voted to be reverted. The current race is {self.race}")
-        button.label = f"{button.label[:-2]}{self.confirmations_needed_yes - len(self.voters_yes)}{button.label[-1]}"
-        await interaction.message.edit(content=interaction.message.content, view=self)
-        await interaction.response.send_message("You voted to revert the race", ephemeral=True)
-
-
-    @discord.ui.button(label="No (+2)", style=discord.ButtonStyle.red)
-    async def button_no(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if interaction.user.id == self.command_user_id:
-            return await interaction.message.delete()
-        if interaction.user.id == self.voters_no:
-            return await interaction.response.send_message("You have already voted to not revert the race!", ephemeral=True)
-        self.voters_no.append(interaction.user.id)
-        if self.confirmations_needed_no == self.confirmations_no:
-            await self.disable_all_buttons(interaction)
-            button.label = f"{button.label[:-2]}{self.confirmations_needed_yes - len(self.voters_yes)}{button.label[-1]}"
-            await interaction.message.edit(content=interaction.message.content, view=self)
-            return await interaction.response.send_message("This race was voted to not be reverted.")
-        button.label = f"{self.button.label[:-2]}{self.confirmations_needed_no - len(self.voters_no)}{button.label[-1]}"
-        await interaction.message.edit(content=interaction.message.content, view=self)
-        await interaction.response.send_message("You voted to not revert the race", ephemeral=True)
-
-class ConfirmationMenu2(discord.ui.View, BotCommands):
-    def __init__(self, command_user_id, location_id, format, tags):
-        super().__init__()
-        self.value = None
-        self.command_user_id = command_user_id
-        self.location_id = location_id
-        self.format = format
-        self.tags = tags
-
-        self.voters_yes = []
-        self.voters_no = []
-
-        self.confirmations_needed_yes = 2
-        self.confirmations_needed_no = 2
-
-        self.voters_yes.append(self.command_user_id)
-
-    async def disable_all_buttons(self, interaction):
-        for button in self.children:
-            button.disabled = True
-        await interaction.message.edit(view=self)
-
-    @discord.ui.button(label="Yes (+2)", style=discord.ButtonStyle.green)
-    async def button_yes(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if interaction.user.id == self.command_user_id or interaction.user.id in self.voters_yes:
-            return await interaction.response.send_message("You have already voted to restart the mogi-standings!", ephemeral=True)
-        self.voters_yes.append(interaction.user.id)
-        if self.confirmations_needed_yes <= len(self.voters_yes):
-            await self.disable_all_buttons(interaction)
-            await self.add_new_location_to_json(self.location_id, self.format, self.tags)
-            button.label = f"{button.label[:-2]}{self.confirmations_needed_yes - len(self.voters_yes)}{button.label[-1]}"
-            await interaction.message.edit(content=interaction.message.content, view=self)
-            return await interaction.response.send_message(f"The mogi-standings were voted to be reverted!")
-        button.label = f"{button.label[:-2]}{self.confirmations_needed_yes - len(self.voters_yes)}{button.label[-1]}"
-        await interaction.message.edit(content=interaction.message.content, view=self)
-        await interaction.response.send_message("You voted to restart the mogi-standings", ephemeral=True)
-
-
-    @discord.ui.button(label="No (+2)", style=discord.ButtonStyle.red)
-    async def button_no(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if interaction.user.id == self.command_user_id:
-            return await interaction.message.delete()
-        if interaction.user.id == self.voters_no:
-            return await interaction.response.send_message("You have already voted not to restart the mogi-standings!", ephemeral=True)
-        self.voters_no.append(interaction.user.id)
-        if self.confirmations_needed_no == self.confirmations_no:
-            await self.disable_all_buttons(interaction)
-            button.label = f"{button.label[:-2]}{self.confirmations_needed_yes - len(self.voters_yes)}{button.label[-1]}"
-            await interaction.message.edit(content=interaction.message.content, view=self)
-            return await interaction.response.send_message("The mogi-standings were voted to not be reverted")
-        button.label = f"{self.button.label[:-2]}{self.confirmations_needed_no - len(self.voters_no)}{button.label[-1]}"
-        await interaction.message.edit(content=interaction.message.content, view=self)
-        await interaction.response.send_message("You voted not to restart the mogi-standings", ephemeral=True)
+    async def callback(self, interaction):
+        await interaction.client.get_cog("BotCommands").handle_vote(interaction, self.vote_id, self.choice)
 
 
 async def setup(bot):
+    bot.add_dynamic_items(VoteButton)
     await bot.add_cog(
         BotCommands(bot)
     )
@@ -1,30 +1,72 @@
-import discord
 from discord.ext import commands
 
 import json
 import asyncio
 
+from utils.state import state_store
+from utils.storage import create_storage
+from utils.journal import MogiJournal
+from utils.archive import MogiArchive
+from utils.table_client import table_client
+from utils.table_renderer import table_renderer
+from utils.image_cache import table_image_cache
+from utils.live_standings import live_standings
+from utils.metrics import metrics
+from utils.sharding import coordinator, launch, shard_of
+from utils.gateway import client_options
+from utils.votes import vote_registry
+
 
 with open("config.json") as config_file:
     config = json.load(config_file)
 
-async def open_current_data():
-    with open("cogs/current_data.json") as current_data_file:
-        current_data = json.load(current_data_file)
-        return current_data
-
 
-class MyBot(commands.Bot):
+class MyBot(commands.AutoShardedBot):
 
-    def __init__(self):
+    def __init__(self, process=None, shard_ids=None, shard_count=None, connection=None):
         super().__init__(
             command_prefix="#",
-            intents=discord.Intents.all(),
-            application_id=config["APPLICATION_ID"]
+            application_id=config["APPLICATION_ID"],
+            shard_ids=shard_ids,
+            shard_count=shard_count,
+            **client_options(config.get("INTENTS_PROFILE", "lean"), config.get("MEMBER_CACHE"), config.get("MESSAGE_CACHE_SIZE"))
         )
         self.synced = True
+        self.process = process
+        self.connection = connection
+
+    def process_path(self, path):
+        # every process owns its own files, the guild state files are split by shard already
+        if self.process is None or path is None:
+            return path
+        return f"{path}.{self.process}"
 
     async def setup_hook(self):
+        if self.process is not None and config.get("STATE_BACKEND", "shards") != "shards":
+            raise RuntimeError("Running several bot processes needs the shards state backend")
+        if self.connection is not None:
+            coordinator.start(self.connection)
+        metrics.instrument_discord(self)
+        metrics.start(config.get("METRICS_LOOP_LAG_INTERVAL", 0.5), self.process_path(config.get("METRICS_PROMETHEUS_PATH")), config.get("METRICS_PROMETHEUS_INTERVAL", 60))
+        journal = MogiJournal(self.process_path(config.get("STATE_JOURNAL_PATH", "cogs/current_data.journal")), config.get("STATE_JOURNAL_SYNC_INTERVAL", 0.05))
+        storage = create_storage(config.get("STATE_BACKEND", "shards"), config.get("STATE_PATH"), config.get("STATE_CODEC", "json"))
+        if self.process is not None:
+            storage.owns = lambda guild_id: shard_of(guild_id, self.shard_count) in self.shard_ids
+            storage.import_path = None
+        await state_store.load(storage, journal)
+        state_store.archive = MogiArchive(config.get("ARCHIVE_PATH", "cogs/archive.sqlite3"))
+        state_store.idle_ttl = config.get("MOGI_IDLE_TTL", 7 * 24 * 3600)
+        state_store.sweep_interval = config.get("MOGI_SWEEP_INTERVAL", 600)
+        state_store.start(config.get("STATE_FLUSH_INTERVAL", 5))
+        vote_registry.path = self.process_path(config.get("VOTES_PATH", "cogs/votes.json"))
+        vote_registry.ttl = config.get("VOTE_TTL", vote_registry.ttl)
+        vote_registry.max_per_location = config.get("VOTES_PER_LOCATION", vote_registry.max_per_location)
+        vote_registry.load()
+        await table_client.start(config.get("TABLE_IMAGE_URL"), config.get("TABLE_IMAGE_TIMEOUT"))
+        table_renderer.start(config.get("TABLE_RENDER_WORKERS"))
+        table_image_cache.max_bytes = config.get("TABLE_CACHE_BYTES", table_image_cache.max_bytes)
+        live_standings.min_interval = config.get("LIVE_STANDINGS_INTERVAL", live_standings.min_interval)
+        live_standings.start(self)
         extensions = ["commands", "administration"]
         for extension in extensions:
             await self.load_extension(f"cogs.{extension}")
@@ -35,13 +77,27 @@ class MyBot(commands.Bot):
 
     async def on_guild_join(self, guild):
         print(f"Joined {guild.name} ({guild.id})")
-        current_data = await open_current_data()
-        current_data["servers"][guild.id] = {"restricted_users": []}
-        with open("cogs/current_data.json", "w") as json_file:
-            json.dump(current_data, json_file, indent=4)
+
+    async def close(self):
+        live_standings.close()
+        await state_store.close()
+        await table_client.close()
+        table_renderer.close()
+        metrics.close()
+        coordinator.close()
+        await super().close()
 
 
-bot = MyBot()
+def run_bot(process=None, shard_ids=None, shard_count=None, connection=None):
+    bot = MyBot(process, shard_ids, shard_count, connection)
+    bot.run(config["TOKEN"])
 
 
-bot.run(config["TOKEN"])
+if __name__ == "__main__":
+    processes = config.get("PROCESSES", 1)
+    if processes > 1:
+        # split a legacy state file once, before the processes share the guild files
+        create_storage("shards", config.get("STATE_PATH"), config.get("STATE_CODEC", "json")).load()
+        launch(run_bot, processes, config.get("SHARD_COUNT") or processes)
+    else:
+        run_bot(shard_count=config.get("SHARD_COUNT"))
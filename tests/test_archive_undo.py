@@ -0,0 +1,101 @@
+import asyncio
+
+from utils.mogi import Mogi
+from utils.state import MogiStateStore
+from utils.storage import ShardedJsonStorage
+from utils.journal import MogiJournal
+from utils.archive import MogiArchive
+
+LOCATION_ID = "1-1"
+TAGS = ["A", "B", "C", "D", "E", "F"]
+
+
+def make_store(tmp_path):
+    return MogiStateStore(
+        ShardedJsonStorage(str(tmp_path / "state"), import_path=None),
+        MogiJournal(str(tmp_path / "current_data.journal")),
+        archive=MogiArchive(str(tmp_path / "archive.sqlite3"))
+    )
+
+
+async def finish_mogi(store):
+    async with store.transaction(LOCATION_ID) as transaction:
+        transaction.replace(Mogi(2, TAGS))
+    async with store.transaction(LOCATION_ID) as transaction:
+        for team in range(len(TAGS)):
+            transaction.mogi.set_spots(0, team, [team * 2 + 1, team * 2 + 2])
+    async with store.transaction(LOCATION_ID) as transaction:
+        transaction.archive("finished")
+
+
+async def undo(store):
+    async with store.transaction(LOCATION_ID) as transaction:
+        assert store.undo(transaction)
+
+
+def test_undoing_a_finish_removes_it_from_the_archive(tmp_path):
+    async def run():
+        store = make_store(tmp_path)
+        await store.load()
+        await finish_mogi(store)
+        assert store.archive.tag_stats("1", "A")["mogis"] == 1
+        await undo(store)
+        assert store.current_locations[LOCATION_ID].team_spots(0, 0) == [1, 2]
+        assert store.archive.tag_stats("1", "A") is None
+        assert store.archive.latest(LOCATION_ID) is None
+        await store.close()
+
+    asyncio.run(run())
+
+
+def test_undoing_a_finish_after_a_restart(tmp_path):
+    async def run():
+        store = make_store(tmp_path)
+        await store.load()
+        store.journal.start()
+        await finish_mogi(store)
+        # crash before the flush, the finish only survives in the journal
+        await store.journal.close()
+        store.archive.close()
+
+        restarted = make_store(tmp_path)
+        await restarted.load()
+        assert LOCATION_ID not in restarted.current_locations
+        await undo(restarted)
+        assert restarted.current_locations[LOCATION_ID].team_spots(0, 0) == [1, 2]
+        assert restarted.archive.tag_stats("1", "A") is None
+        await restarted.close()
+
+    asyncio.run(run())
+
+
+async def restore_mogi(store):
+    async with store.transaction(LOCATION_ID) as transaction:
+        archive_id, archived_at, reason, mogi = store.archive.latest(LOCATION_ID)
+        transaction.restore(archive_id, reason, mogi)
+
+
+def test_undoing_a_restore_archives_the_mogi_again(tmp_path):
+    async def run():
+        store = make_store(tmp_path)
+        await store.load()
+        store.journal.start()
+        await finish_mogi(store)
+        await restore_mogi(store)
+        assert store.archive.latest(LOCATION_ID) is None
+        assert store.archive.tag_stats("1", "A") is None
+        await store.journal.close()
+        store.archive.close()
+
+        restarted = make_store(tmp_path)
+        await restarted.load()
+        assert restarted.current_locations[LOCATION_ID].team_spots(0, 0) == [1, 2]
+        await undo(restarted)
+        assert LOCATION_ID not in restarted.current_locations
+        archive_id, archived_at, reason, mogi = restarted.archive.latest(LOCATION_ID)
+        assert reason == "finished"
+        assert mogi.team_spots(0, 0) == [1, 2]
+        assert restarted.archive.tag_stats("1", "A")["mogis"] == 1
+        await restarted.close()
+
+    asyncio.run(run())
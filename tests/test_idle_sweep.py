@@ -0,0 +1,82 @@
+import os
+import time
+import asyncio
+import sqlite3
+
+import pytest
+
+from utils.mogi import Mogi
+from utils.state import MogiStateStore
+from utils.storage import ShardedJsonStorage
+from utils.archive import MogiArchive
+
+TAGS = ["A", "B", "C", "D", "E", "F"]
+IDLE_TTL = 3600
+
+
+def make_store(tmp_path):
+    return MogiStateStore(
+        ShardedJsonStorage(str(tmp_path / "state"), import_path=None),
+        archive=MogiArchive(str(tmp_path / "archive.sqlite3")),
+        idle_ttl=IDLE_TTL
+    )
+
+
+def age(tmp_path, guild_id, seconds):
+    path = tmp_path / "state" / f"{guild_id}.state"
+    os.utime(path, (time.time() - seconds, time.time() - seconds))
+
+
+def test_sweep_only_keeps_guilds_with_idle_mogis(tmp_path):
+    async def run():
+        store = make_store(tmp_path)
+        await store.load()
+        for guild_id in ("1", "2", "3"):
+            async with store.transaction(f"{guild_id}-1") as transaction:
+                transaction.replace(Mogi(2, TAGS))
+            store.server(guild_id)
+        # guild 2 keeps only its settings
+        async with store.transaction("2-1") as transaction:
+            transaction.delete()
+        for guild_id in ("1", "3"):
+            store.current_locations[f"{guild_id}-1"].last_activity = int(time.time()) - 2 * IDLE_TTL
+        await store.close()
+        age(tmp_path, "1", 2 * IDLE_TTL)
+        age(tmp_path, "2", 2 * IDLE_TTL)
+
+        restarted = make_store(tmp_path)
+        await restarted.load()
+        assert await restarted.evict_idle() == 1
+        assert restarted.archive.latest("1-1")[2] == "idle"
+        assert restarted.loaded_guilds == {"1"}
+        assert restarted.guilds_without_mogis == {"2"}
+        # guild 3 was saved recently, its file can't hold idle mogis yet
+        assert "3" not in restarted.loaded_guilds
+        assert await restarted.evict_idle() == 0
+        assert restarted.loaded_guilds == {"1"}
+        await restarted.close()
+
+    asyncio.run(run())
+
+
+def test_failed_archive_keeps_the_mogi(tmp_path):
+    async def run():
+        store = make_store(tmp_path)
+        await store.load()
+        async with store.transaction("1-1") as transaction:
+            transaction.replace(Mogi(2, TAGS))
+        store.current_locations["1-1"].last_activity = int(time.time()) - 2 * IDLE_TTL
+
+        def locked(*args):
+            raise sqlite3.OperationalError("database is locked")
+
+        store.archive.store = locked
+        with pytest.raises(sqlite3.OperationalError):
+            await store.evict_idle()
+        assert "1-1" in store.current_locations
+        del store.archive.store
+        assert await store.evict_idle() == 1
+        assert "1-1" not in store.current_locations
+        await store.close()
+
+    asyncio.run(run())
@@ -0,0 +1,41 @@
+import random
+
+import pytest
+
+from utils.mogi import Mogi
+from utils.scoring import AMOUNT_OF_RACES, SPOT_POINTS
+
+TEAMS_PER_FORMAT = {2: 6, 3: 4, 4: 3, 6: 2}
+
+
+def recomputed_race_points(mogi, race, team):
+    return sum(SPOT_POINTS[spot] for spot in mogi.team_spots(race, team))
+
+
+def check_scoreboard(mogi):
+    scoreboard = mogi.scoreboard
+    teams = range(mogi.amount_of_teams)
+    for team in teams:
+        assert scoreboard.total(team) == sum(recomputed_race_points(mogi, race, team) for race in range(AMOUNT_OF_RACES))
+    for race in range(AMOUNT_OF_RACES):
+        for team in teams:
+            for other_team in teams:
+                assert scoreboard.race_differential(race, team, other_team) == (
+                    recomputed_race_points(mogi, race, team) - recomputed_race_points(mogi, race, other_team)
+                )
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_scoreboard_matches_full_recompute(seed):
+    generator = random.Random(seed)
+    format = generator.choice(list(TEAMS_PER_FORMAT))
+    mogi = Mogi(format, [f"T{team}" for team in range(TEAMS_PER_FORMAT[format])])
+    for _ in range(100):
+        race = generator.randrange(AMOUNT_OF_RACES)
+        if generator.random() < 0.15:
+            mogi.reset_race(race)
+        else:
+            spots = generator.sample(range(1, 13), generator.randint(0, format))
+            mogi.set_spots(race, generator.randrange(mogi.amount_of_teams), spots)
+        check_scoreboard(mogi)
+    check_scoreboard(mogi.copy())
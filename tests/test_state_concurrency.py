@@ -0,0 +1,105 @@
+import asyncio
+import random
+from io import BytesIO
+
+import pytest
+
+from cogs.commands import BotCommands
+from utils.state import state_store
+from utils.storage import JsonStorage, SqliteStorage, ShardedJsonStorage
+from utils.scoring import SPOT_POINTS
+from utils.table_client import table_client
+from utils.votes import vote_registry
+from benchmarks.fake_discord import FakeChannel, FakeInteraction, FakeUser
+
+GUILDS = 10
+CHANNELS = 5
+# the twelfth race would finish the mogi and archive it
+RACES = 11
+TAGS = ["A", "B", "C", "D", "E", "F"]
+
+
+def make_storage(backend, tmp_path):
+    if backend == "json":
+        return JsonStorage(str(tmp_path / "current_data.json"))
+    if backend == "sqlite":
+        return SqliteStorage(str(tmp_path / "current_data.sqlite3"))
+    return ShardedJsonStorage(str(tmp_path / "state"), import_path=None)
+
+
+def expected_spots(location_id, race):
+    # every race of every location gets its own order of the 12 spots
+    spots = list(range(1, 13))
+    random.Random(f"{location_id}-{race}").shuffle(spots)
+    return spots
+
+
+async def fetch_table(url):
+    await asyncio.sleep(0)
+    return BytesIO(b"table")
+
+
+async def play_mogi(cog, guild_id, channel_id):
+    channel = FakeChannel(channel_id)
+    location_id = f"{guild_id}-{channel_id}"
+
+    def interaction():
+        return FakeInteraction(guild_id, channel, FakeUser(guild_id * 100 + channel_id))
+
+    await BotCommands.start.callback(cog, interaction(), 2, " ".join(TAGS))
+    for race in range(RACES):
+        spots = expected_spots(location_id, race)
+        # five teams enter their spots at once, the last one is filled in automatically
+        calls = [
+            BotCommands.spots.callback(cog, interaction(), tag, " ".join(map(str, spots[team * 2:team * 2 + 2])))
+            for team, tag in enumerate(TAGS[:-1])
+        ]
+        random.Random(f"{location_id}-{race}").shuffle(calls)
+        await asyncio.gather(*calls)
+
+
+def check_locations(location_ids):
+    for location_id in location_ids:
+        mogi = state_store.current_locations[location_id]
+        totals = [0] * len(TAGS)
+        for race in range(RACES):
+            spots = expected_spots(location_id, race)
+            for team in range(len(TAGS)):
+                team_spots = spots[team * 2:team * 2 + 2]
+                assert sorted(mogi.team_spots(race, team)) == sorted(team_spots), (location_id, race, team)
+                totals[team] += sum(SPOT_POINTS[spot] for spot in team_spots)
+        assert [mogi.total_score(team) for team in range(len(TAGS))] == totals, location_id
+        assert mogi.current_race == RACES
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite", "shards"])
+def test_concurrent_spots_are_not_lost(backend, tmp_path, monkeypatch):
+    location_ids = [f"{guild}-{channel}" for guild in range(1, GUILDS + 1) for channel in range(1, CHANNELS + 1)]
+    enter_spots_to_data = BotCommands.enter_spots_to_data
+
+    async def slow_enter_spots_to_data(*args):
+        # hand the loop to the other /spots calls in the middle of the transaction
+        await asyncio.sleep(0)
+        await enter_spots_to_data(*args)
+
+    monkeypatch.setattr(BotCommands, "enter_spots_to_data", staticmethod(slow_enter_spots_to_data))
+    monkeypatch.setattr(table_client, "fetch", fetch_table)
+    # a lost update would open a vote, it mustn't be written into the bot's own votes file
+    monkeypatch.setattr(vote_registry, "path", str(tmp_path / "votes.json"))
+
+    async def run():
+        await state_store.load(make_storage(backend, tmp_path))
+        cog = BotCommands(None)
+        await asyncio.gather(*(
+            play_mogi(cog, guild, channel) for guild in range(1, GUILDS + 1) for channel in range(1, CHANNELS + 1)
+        ))
+        check_locations(location_ids)
+        await state_store.close()
+
+        await state_store.load(make_storage(backend, tmp_path))
+        for guild in range(1, GUILDS + 1):
+            state_store.ensure_guild(str(guild))
+        check_locations(location_ids)
+        await state_store.close()
+
+    asyncio.run(run())
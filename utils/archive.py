@@ -0,0 +1,137 @@
+import json
+import time
+import zlib
+import sqlite3
+from array import array
+
+from utils.journal import encode_mogi, decode_mogi
+from utils.scoring import AMOUNT_OF_RACES
+
+
+class MogiArchive:
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS archived_mogis (
+            archive_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            location_id TEXT NOT NULL,
+            guild_id TEXT NOT NULL,
+            archived_at REAL NOT NULL,
+            reason TEXT NOT NULL,
+            data BLOB NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS archived_mogis_location ON archived_mogis (location_id, archive_id);
+        CREATE INDEX IF NOT EXISTS archived_mogis_guild ON archived_mogis (guild_id);
+        CREATE TABLE IF NOT EXISTS team_results (
+            archive_id INTEGER NOT NULL,
+            team INTEGER NOT NULL,
+            guild_id TEXT NOT NULL,
+            tag TEXT NOT NULL COLLATE NOCASE,
+            score INTEGER NOT NULL,
+            placement INTEGER NOT NULL,
+            races_won INTEGER NOT NULL,
+            race_points BLOB NOT NULL,
+            PRIMARY KEY (archive_id, team)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS team_results_tag ON team_results (guild_id, tag, score, placement, races_won);
+    """
+
+    def __init__(self, path="cogs/archive.sqlite3"):
+        self.path = path
+        self.connection = None
+
+    def connect(self):
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.executescript(self.SCHEMA)
+        return self.connection
+
+    def store(self, location_id, mogi, reason):
+        data = zlib.compress(json.dumps(encode_mogi(mogi), separators=(",", ":")).encode())
+        connection = self.connect()
+        with connection:
+            cursor = connection.execute(
+                "INSERT INTO archived_mogis (location_id, guild_id, archived_at, reason, data) VALUES (?, ?, ?, ?, ?)",
+                (location_id, location_id.split("-", 1)[0], time.time(), reason, data)
+            )
+            if reason == "finished":
+                connection.executemany(
+                    "INSERT INTO team_results VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    self.team_results(cursor.lastrowid, location_id.split("-", 1)[0], mogi)
+                )
+        return cursor.lastrowid
+
+    @staticmethod
+    def team_results(archive_id, guild_id, mogi):
+        scoreboard = mogi.scoreboard
+        teams = range(mogi.amount_of_teams)
+        race_winners = []
+        for race in range(AMOUNT_OF_RACES):
+            best = max(scoreboard.points(race, team) for team in teams)
+            race_winners.append({team for team in teams if best != 0 and scoreboard.points(race, team) == best})
+        for team in teams:
+            score = scoreboard.total(team)
+            yield (
+                archive_id, team, guild_id, mogi.tags[team], score,
+                1 + sum(scoreboard.total(other_team) > score for other_team in teams),
+                sum(team in winners for winners in race_winners),
+                array("H", (scoreboard.points(race, team) for race in range(AMOUNT_OF_RACES))).tobytes()
+            )
+
+    def tag_stats(self, guild_id, tag):
+        row = self.connect().execute(
+            "SELECT COUNT(*), AVG(score), AVG(placement), SUM(placement = 1), SUM(races_won) FROM team_results WHERE guild_id = ? AND tag = ?",
+            (guild_id, tag)
+        ).fetchone()
+        if row[0] == 0:
+            return None
+        mogis, average_score, average_placement, mogi_wins, races_won = row
+        return {
+            "mogis": mogis,
+            "average_score": average_score,
+            "average_placement": average_placement,
+            "mogi_wins": mogi_wins,
+            "race_win_rate": races_won / (mogis * AMOUNT_OF_RACES)
+        }
+
+    def guild_stats(self, guild_id, limit=10):
+        connection = self.connect()
+        mogis = connection.execute(
+            "SELECT COUNT(*) FROM team_results WHERE guild_id = ? AND team = 0", (guild_id,)
+        ).fetchone()[0]
+        tags = connection.execute(
+            "SELECT tag, COUNT(*), AVG(score), AVG(placement), SUM(races_won) * 1.0 / (COUNT(*) * ?) FROM team_results "
+            "WHERE guild_id = ? GROUP BY tag ORDER BY COUNT(*) DESC, AVG(score) DESC LIMIT ?",
+            (AMOUNT_OF_RACES, guild_id, limit)
+        ).fetchall()
+        return mogis, tags
+
+    def head_to_head(self, guild_id, tag, limit=10):
+        return self.connect().execute(
+            "SELECT opponent.tag, SUM(team.score > opponent.score), SUM(team.score < opponent.score), SUM(team.score = opponent.score), "
+            "AVG(team.score - opponent.score) FROM team_results AS team JOIN team_results AS opponent "
+            "ON opponent.archive_id = team.archive_id AND opponent.team != team.team "
+            "WHERE team.guild_id = ? AND team.tag = ? GROUP BY opponent.tag ORDER BY COUNT(*) DESC LIMIT ?",
+            (guild_id, tag, limit)
+        ).fetchall()
+
+    def latest(self, location_id):
+        row = self.connect().execute(
+            "SELECT archive_id, archived_at, reason, data FROM archived_mogis WHERE location_id = ? ORDER BY archive_id DESC LIMIT 1",
+            (location_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        archive_id, archived_at, reason, data = row
+        return archive_id, archived_at, reason, decode_mogi(json.loads(zlib.decompress(data)))
+
+    def remove(self, archive_id):
+        connection = self.connect()
+        with connection:
+            connection.execute("DELETE FROM archived_mogis WHERE archive_id = ?", (archive_id,))
+            connection.execute("DELETE FROM team_results WHERE archive_id = ?", (archive_id,))
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
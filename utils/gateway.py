@@ -0,0 +1,31 @@
+import discord
+
+# slash commands need no intent at all, the mod check needs the guild roles and channels and the owner commands arrive as DMs
+INTENT_PROFILES = {
+    "lean": lambda: discord.Intents(guilds=True, dm_messages=True),
+    "default": discord.Intents.default,
+    "all": discord.Intents.all,
+}
+
+
+def client_options(profile="lean", member_cache=None, max_messages=None):
+    if profile not in INTENT_PROFILES:
+        raise ValueError(f"Unknown intents profile {profile}, use one of {', '.join(INTENT_PROFILES)}")
+    intents = INTENT_PROFILES[profile]()
+    if member_cache is None:
+        member_cache = "none" if profile == "lean" else "intents"
+    if member_cache == "none":
+        member_cache_flags = discord.MemberCacheFlags.none()
+    elif member_cache == "intents":
+        member_cache_flags = discord.MemberCacheFlags.from_intents(intents)
+    else:
+        raise ValueError(f"Unknown member cache policy {member_cache}, use none or intents")
+    if max_messages is None:
+        max_messages = 0 if profile == "lean" else 1000
+    return {
+        "intents": intents,
+        "member_cache_flags": member_cache_flags,
+        # discord.py turns the message cache off with None
+        "max_messages": max_messages or None,
+        "chunk_guilds_at_startup": intents.members and member_cache_flags.joined,
+    }
@@ -0,0 +1,60 @@
+import hashlib
+from collections import OrderedDict
+
+
+class TableImageCache:
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._images = OrderedDict()
+        self._location_keys = {}
+
+    @staticmethod
+    def make_key(renderer, table_text):
+        return hashlib.sha256(f"{renderer}\n{table_text}".encode()).hexdigest()
+
+    def get(self, key):
+        image = self.peek(key)
+        if image is None:
+            self.misses += 1
+            return None
+        self._images.move_to_end(key)
+        self.hits += 1
+        return image
+
+    def peek(self, key):
+        # a lookup that doesn't count as one, for callers that already looked the key up
+        entry = self._images.get(key)
+        return entry[0] if entry is not None else None
+
+    def put(self, key, image, location_id=None):
+        if len(image) > self.max_bytes:
+            return
+        self._remove(key)
+        self._images[key] = (image, location_id)
+        self.size += len(image)
+        if location_id is not None:
+            self._location_keys.setdefault(location_id, set()).add(key)
+        while self.size > self.max_bytes:
+            self._remove(next(iter(self._images)))
+
+    def evict_location(self, location_id):
+        for key in self._location_keys.pop(location_id, set()):
+            self._remove(key)
+
+    def _remove(self, key):
+        entry = self._images.pop(key, None)
+        if entry is None:
+            return
+        image, location_id = entry
+        self.size -= len(image)
+        location_keys = self._location_keys.get(location_id)
+        if location_keys is not None:
+            location_keys.discard(key)
+            if len(location_keys) == 0:
+                del self._location_keys[location_id]
+
+
+table_image_cache = TableImageCache()
@@ -0,0 +1,271 @@
+import os
+import json
+import asyncio
+from collections import deque
+
+from utils.mogi import Mogi, SPOTS_PER_RACE
+from utils.scoring import AMOUNT_OF_RACES
+from utils.metrics import metrics
+
+# change records, every one carries the old value so it can be inverted:
+#   ["m", new mogi, old mogi]                  mogi started, restarted or reset
+#   ["t", team, new tag, old tag]              tag changed
+#   ["s", race, team, new spots, old spots]    spots entered or edited
+#   ["v", race, old slots]                     race reverted
+#   ["p", race, slots]                         reverted race restored by an undo
+#   ["r", new race, old race]                  current race changed
+#   ["w", new message id, old message id]      live standings message posted
+#   ["a", new activity, old activity]          last activity, recorded along with the other changes
+#   ["x", archive id]                          mogi archived, undoing the change removes it from the archive again
+#   ["y", reason]                              mogi restored from the archive, undoing the change archives it again
+
+
+def encode_mogi(mogi):
+    if mogi is None:
+        return None
+    return [mogi.format, mogi.tags, mogi.current_race, mogi.placements.tobytes().hex(), mogi.standings_message_id, mogi.last_activity]
+
+
+def decode_mogi(data):
+    if data is None:
+        return None
+    format, tags, current_race, placements, standings_message_id, *rest = data
+    mogi = Mogi(format, tags, current_race, standings_message_id, rest[0] if len(rest) != 0 else None)
+    placements = bytes.fromhex(placements)
+    for race in range(AMOUNT_OF_RACES):
+        mogi.set_race_slots(race, placements[race * SPOTS_PER_RACE:(race + 1) * SPOTS_PER_RACE])
+    return mogi
+
+
+def mogi_changes(old, new, replaced=False):
+    if old is None and new is None:
+        return []
+    if replaced or old is None or new is None:
+        return [["m", encode_mogi(new), encode_mogi(old)]]
+    changes = []
+    for team, (old_tag, new_tag) in enumerate(zip(old.tags, new.tags)):
+        if old_tag != new_tag:
+            changes.append(["t", team, new_tag, old_tag])
+    for race in range(AMOUNT_OF_RACES):
+        old_slots = old.race_slots(race)
+        new_slots = new.race_slots(race)
+        if old_slots == new_slots:
+            continue
+        if not any(new_slots):
+            changes.append(["v", race, list(old_slots)])
+            continue
+        for team in range(new.amount_of_teams):
+            old_spots = old.team_spots(race, team)
+            new_spots = new.team_spots(race, team)
+            if old_spots != new_spots:
+                changes.append(["s", race, team, new_spots, old_spots])
+    if old.current_race != new.current_race:
+        changes.append(["r", new.current_race, old.current_race])
+    if old.standings_message_id != new.standings_message_id:
+        changes.append(["w", new.standings_message_id, old.standings_message_id])
+    if len(changes) != 0 and old.last_activity != new.last_activity:
+        changes.append(["a", new.last_activity, old.last_activity])
+    return changes
+
+
+def invert_changes(changes):
+    inverted = []
+    for change in reversed(changes):
+        kind = change[0]
+        if kind == "x" or kind == "y":
+            continue
+        if kind == "v":
+            inverted.append(["p", change[1], change[2]])
+        elif kind == "p":
+            inverted.append(["v", change[1], change[2]])
+        elif kind == "t":
+            inverted.append(["t", change[1], change[3], change[2]])
+        elif kind == "s":
+            inverted.append(["s", change[1], change[2], change[4], change[3]])
+        else:
+            inverted.append([kind, change[2], change[1]])
+    return inverted
+
+
+def apply_changes(mogi, changes):
+    for change in changes:
+        kind = change[0]
+        if kind == "m":
+            mogi = decode_mogi(change[1])
+        elif mogi is None:
+            continue
+        elif kind == "t":
+            if change[1] < mogi.amount_of_teams:
+                mogi.change_tag(mogi.tags[change[1]], change[2])
+        elif kind == "s":
+            if change[2] < mogi.amount_of_teams and len(change[3]) <= mogi.format:
+                mogi.set_spots(change[1], change[2], change[3])
+        elif kind == "v":
+            mogi.reset_race(change[1])
+        elif kind == "p":
+            mogi.reset_race(change[1])
+            mogi.set_race_slots(change[1], change[2])
+        elif kind == "r":
+            mogi.current_race = change[1]
+        elif kind == "w":
+            mogi.standings_message_id = change[1]
+        elif kind == "a":
+            mogi.last_activity = change[1]
+    return mogi
+
+
+class MogiJournal:
+    def __init__(self, path="cogs/current_data.journal", sync_interval=0.05, history_size=20):
+        self.path = path
+        self.sync_interval = sync_interval
+        self.history_size = history_size
+        self.seq = 0
+        self.pending = []
+        self.history = {}
+        self._file = None
+        self._sync_task = None
+        self._lock = asyncio.Lock()
+
+    def replay(self, servers, current_locations, load_guild=None):
+        touched_servers = set()
+        touched_locations = set()
+        try:
+            journal_file = open(self.path, "rb")
+        except FileNotFoundError:
+            return touched_servers, touched_locations
+        with journal_file:
+            valid_bytes = 0
+            for line in journal_file:
+                try:
+                    record = json.loads(line) if line.endswith(b"\n") else None
+                except ValueError:
+                    record = None
+                if record is None:
+                    # torn write from a crash, everything after it was never acknowledged
+                    break
+                valid_bytes += len(line)
+                self.seq = record["q"]
+                if load_guild is not None:
+                    load_guild(record["g"] if "g" in record else record["l"].split("-", 1)[0])
+                if "r" in record:
+                    restricted_users = servers.setdefault(record["g"], {"restricted_users": []})["restricted_users"]
+                    if record["a"] and record["r"] not in restricted_users:
+                        restricted_users.append(record["r"])
+                    elif not record["a"] and record["r"] in restricted_users:
+                        restricted_users.remove(record["r"])
+                    touched_servers.add(record["g"])
+                    continue
+                if "g" in record:
+                    if record["d"] is None:
+                        servers.pop(record["g"], None)
+                    else:
+                        servers[record["g"]] = record["d"]
+                    touched_servers.add(record["g"])
+                    continue
+                location_id = record["l"]
+                mogi = current_locations.get(location_id)
+                mogi = apply_changes(mogi.copy() if mogi is not None else None, record["c"])
+                if mogi is None:
+                    current_locations.pop(location_id, None)
+                else:
+                    current_locations[location_id] = mogi
+                if not record.get("n", 0):
+                    self._remember(location_id, record["c"], record.get("u", 0))
+                touched_locations.add(location_id)
+        if valid_bytes != os.path.getsize(self.path):
+            with open(self.path, "r+b") as journal_file:
+                journal_file.truncate(valid_bytes)
+        return touched_servers, touched_locations
+
+    def _remember(self, location_id, changes, undo):
+        if undo:
+            history = self.history.get(location_id)
+            if history:
+                history.pop()
+        else:
+            self.history.setdefault(location_id, deque(maxlen=self.history_size)).append(changes)
+
+    def _append(self, record):
+        self.seq += 1
+        self.pending.append((self.seq, json.dumps({"q": self.seq, **record}, separators=(",", ":"))))
+
+    def record_location(self, location_id, changes, undo=False, undoable=True):
+        record = {"l": location_id, "c": changes}
+        if undo:
+            record["u"] = 1
+        if not undoable:
+            record["n"] = 1
+        self._append(record)
+        if not undo and undoable:
+            self._remember(location_id, changes, undo)
+
+    def record_server(self, server_id, server):
+        self._append({"g": server_id, "d": server})
+
+    def record_restriction(self, server_id, user_id, restricted):
+        self._append({"g": server_id, "r": user_id, "a": int(restricted)})
+
+    def pop_last_changes(self, location_id):
+        history = self.history.get(location_id)
+        if not history:
+            return None
+        return history.pop()
+
+    def start(self, sync_interval=None):
+        if sync_interval is not None:
+            self.sync_interval = sync_interval
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        if self._sync_task is None:
+            self._sync_task = asyncio.create_task(self._sync_loop())
+
+    async def _sync_loop(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            await self.sync()
+
+    async def sync(self):
+        if len(self.pending) == 0 or self._file is None:
+            return
+        async with self._lock:
+            lines, self.pending = self.pending, []
+            with metrics.timer("journal_sync_seconds"):
+                await asyncio.to_thread(self._write, [line for _, line in lines])
+
+    def _write(self, lines):
+        self._file.write("\n".join(lines) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    async def compact(self, seq):
+        # everything up to seq is part of the snapshot that was just saved
+        async with self._lock:
+            self.pending = [(record_seq, line) for record_seq, line in self.pending if record_seq > seq]
+            await asyncio.to_thread(self._rewrite, seq)
+
+    def _rewrite(self, seq):
+        reopen = self._file is not None
+        if reopen:
+            self._file.close()
+        try:
+            with open(self.path, encoding="utf-8") as journal_file:
+                lines = [line for line in journal_file if json.loads(line)["q"] > seq]
+        except FileNotFoundError:
+            lines = []
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as journal_file:
+            journal_file.writelines(lines)
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+        os.replace(temp_path, self.path)
+        if reopen:
+            self._file = open(self.path, "a", encoding="utf-8")
+
+    async def close(self):
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            self._sync_task = None
+        await self.sync()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
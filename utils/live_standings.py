@@ -0,0 +1,95 @@
+import asyncio
+from io import BytesIO
+
+import discord
+
+from utils.state import state_store
+from utils.metrics import metrics
+
+
+class LiveStandings:
+    def __init__(self, min_interval=2.0):
+        # Discord allows about 5 edits per 5 seconds in a channel, stay well below that
+        self.min_interval = min_interval
+        self.client = None
+        self._pending = {}
+        self._tasks = {}
+        self._unpins = set()
+
+    def start(self, client):
+        self.client = client
+        state_store.on_standings_retired = self.retire
+
+    def update(self, location_id, channel, content, image, message_id=None):
+        if location_id in self._pending:
+            metrics.inc("live_standings_total", "coalesced")
+        self._pending[location_id] = (channel, content, image, message_id)
+        if location_id not in self._tasks:
+            self._tasks[location_id] = asyncio.create_task(self._run(location_id))
+
+    async def _run(self, location_id):
+        try:
+            while location_id in self._pending:
+                channel, content, image, message_id = self._pending.pop(location_id)
+                try:
+                    await self._publish(location_id, channel, content, image, message_id)
+                except discord.HTTPException as error:
+                    metrics.inc("live_standings_total", "failed")
+                    print(f"Couldn't update the live standings of {location_id}: {error}")
+                await asyncio.sleep(self.min_interval)
+        finally:
+            del self._tasks[location_id]
+
+    @staticmethod
+    def message_id(location_id, fallback=None):
+        mogi = state_store.current_locations.get(location_id)
+        if mogi is not None and mogi.standings_message_id is not None:
+            return mogi.standings_message_id
+        return fallback
+
+    async def _publish(self, location_id, channel, content, image, message_id):
+        message_id = self.message_id(location_id, message_id)
+        if message_id is not None:
+            try:
+                await channel.get_partial_message(message_id).edit(content=content, attachments=[discord.File(BytesIO(image), "table.png")])
+                metrics.inc("live_standings_total", "edited")
+                return
+            except discord.NotFound:
+                pass
+        message = await channel.send(content, file=discord.File(BytesIO(image), "table.png"))
+        metrics.inc("live_standings_total", "posted")
+        try:
+            await message.pin()
+        except discord.HTTPException as error:
+            print(f"Couldn't pin the live standings of {location_id}: {error}")
+        async with state_store.transaction(location_id) as transaction:
+            transaction.undoable = False
+            if transaction.mogi is not None:
+                transaction.mogi.standings_message_id = message.id
+
+    def retire(self, location_id, message_id):
+        # every mogi pins its own message, old ones would fill up the 50 pins of the channel
+        if self.client is None:
+            return
+        task = asyncio.create_task(self._unpin(location_id, message_id))
+        self._unpins.add(task)
+        task.add_done_callback(self._unpins.discard)
+
+    async def _unpin(self, location_id, message_id):
+        channel = self.client.get_partial_messageable(int(location_id.split("-", 1)[1]))
+        try:
+            await channel.get_partial_message(message_id).unpin()
+            metrics.inc("live_standings_total", "unpinned")
+        except discord.NotFound:
+            pass
+        except discord.HTTPException as error:
+            metrics.inc("live_standings_total", "failed")
+            print(f"Couldn't unpin the old live standings of {location_id}: {error}")
+
+    def close(self):
+        for task in list(self._tasks.values()) + list(self._unpins):
+            task.cancel()
+        self._pending.clear()
+
+
+live_standings = LiveStandings()
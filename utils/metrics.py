@@ -0,0 +1,179 @@
+import os
+import time
+import asyncio
+from bisect import bisect_left
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# metric name -> (label name, help text)
+METRICS = {
+    "command_seconds": ("command", "Latency of app commands"),
+    "command_errors_total": ("command", "App commands that raised an error"),
+    "state_load_seconds": ("scope", "Time spent loading the state at the start or one guild of it"),
+    "state_flush_seconds": (None, "Time spent writing the state"),
+    "journal_sync_seconds": (None, "Time spent writing and fsyncing a journal group"),
+    "table_image_seconds": ("renderer", "Time spent rendering or fetching a standings table"),
+    "table_cache_total": ("result", "Standings table cache lookups"),
+    "render_requests_total": ("result", "Standings render requests, rendered or coalesced into a pending render"),
+    "live_standings_total": ("result", "Live standings messages posted, edited, coalesced into a newer update or failed"),
+    "mogis_archived_total": ("reason", "Mogis moved from the state to the archive"),
+    "mogis_restored_total": (None, "Archived mogis restored with /restore_mogi"),
+    "loop_lag_seconds": (None, "How late the event loop woke up a sleeping task"),
+    "discord_api_calls_total": ("route", "Requests sent to the Discord API")
+}
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        # upper bound of the bucket the quantile falls into
+        rank = q * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count != 0:
+                return LATENCY_BUCKETS[bucket] if bucket < len(LATENCY_BUCKETS) else float("inf")
+        return 0.0
+
+
+class MetricsRegistry:
+    def __init__(self, prefix="mogibot"):
+        self.prefix = prefix
+        self.counters = {}
+        self.histograms = {}
+        self.started = time.time()
+        self.prometheus_path = None
+        self._tasks = []
+
+    def inc(self, name, label=None, amount=1):
+        key = (name, label)
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, seconds, label=None):
+        key = (name, label)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, name, label=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, label)
+
+    def instrument_discord(self, bot):
+        from discord.webhook.async_ import async_context
+
+        # interaction responses and followups go through the webhook adapter, everything else through bot.http
+        for client in (bot.http, async_context.get()):
+            client.request = self._counted(client.request)
+
+    def _counted(self, request):
+        async def counted_request(route, *args, **kwargs):
+            self.inc("discord_api_calls_total", f"{route.method} {route.path}")
+            return await request(route, *args, **kwargs)
+        return counted_request
+
+    def start(self, loop_lag_interval=0.5, prometheus_path=None, prometheus_interval=60):
+        self.prometheus_path = prometheus_path
+        if len(self._tasks) != 0:
+            return
+        self._tasks.append(asyncio.create_task(self._sample_loop_lag(loop_lag_interval)))
+        if prometheus_path is not None:
+            self._tasks.append(asyncio.create_task(self._dump_loop(prometheus_interval)))
+
+    async def _sample_loop_lag(self, interval):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            self.observe("loop_lag_seconds", max(0.0, time.perf_counter() - start - interval))
+
+    async def _dump_loop(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            self.write_prometheus()
+
+    def close(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+        if self.prometheus_path is not None:
+            self.write_prometheus()
+
+    @staticmethod
+    def _sorted(metrics):
+        return sorted(metrics.items(), key=lambda item: (item[0][0], str(item[0][1])))
+
+    def _labels(self, name, label, extra=""):
+        label_name = METRICS.get(name, ("label", None))[0]
+        labels = []
+        if label is not None and label_name is not None:
+            escaped = str(label).replace("\\", "\\\\").replace('"', '\\"')
+            labels.append(f'{label_name}="{escaped}"')
+        if extra:
+            labels.append(extra)
+        return "{" + ",".join(labels) + "}" if labels else ""
+
+    def render_prometheus(self):
+        lines = []
+        described = set()
+
+        def describe(name, kind):
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {self.prefix}_{name} {METRICS.get(name, (None, name))[1]}")
+                lines.append(f"# TYPE {self.prefix}_{name} {kind}")
+
+        for (name, label), value in self._sorted(self.counters):
+            describe(name, "counter")
+            lines.append(f"{self.prefix}_{name}{self._labels(name, label)} {value}")
+        for (name, label), histogram in self._sorted(self.histograms):
+            describe(name, "histogram")
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), histogram.counts):
+                cumulative += count
+                bucket_labels = self._labels(name, label, f'le="{bound}"')
+                lines.append(f"{self.prefix}_{name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.prefix}_{name}_sum{self._labels(name, label)} {histogram.sum}")
+            lines.append(f"{self.prefix}_{name}_count{self._labels(name, label)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path=None):
+        path = path or self.prometheus_path or "metrics.prom"
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as prometheus_file:
+            prometheus_file.write(self.render_prometheus())
+        os.replace(temp_path, path)
+        return path
+
+    def render_summary(self):
+        uptime = int(time.time() - self.started)
+        lines = [f"Uptime: {uptime // 3600}h {uptime % 3600 // 60}m"]
+        for (name, label), histogram in self._sorted(self.histograms):
+            title = name if label is None else f"{name}[{label}]"
+            lines.append(
+                f"{title}: n={histogram.count} avg={histogram.sum / histogram.count * 1e3:.1f}ms "
+                f"p50<={histogram.quantile(0.5) * 1e3:g}ms p95<={histogram.quantile(0.95) * 1e3:g}ms p99<={histogram.quantile(0.99) * 1e3:g}ms"
+            )
+        for (name, label), value in self._sorted(self.counters):
+            title = name if label is None else f"{name}[{label}]"
+            lines.append(f"{title}: {value}")
+        return "\n".join(lines)
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,143 @@
+import time
+from array import array
+
+from utils.scoring import AMOUNT_OF_RACES, ScoreBoard
+from utils.validation import RaceValidator
+
+SPOTS_PER_RACE = 12
+
+
+class Mogi:
+    __slots__ = ("format", "current_race", "tags", "tag_indexes", "placements", "scoreboard", "validator", "standings_message_id", "last_activity")
+
+    def __init__(self, format, tags, current_race=0, standings_message_id=None, last_activity=None):
+        self.format = format
+        self.current_race = current_race
+        self.standings_message_id = standings_message_id
+        # unix time of the last committed change, idle mogis are archived
+        self.last_activity = int(time.time()) if last_activity is None else last_activity
+        self.tags = list(tags)
+        # casefolded tag -> team, tags are matched case-insensitively
+        self.tag_indexes = {tag.casefold(): team for team, tag in enumerate(self.tags)}
+        # race x entry slot -> spot, every team owns `format` consecutive slots and 0 marks an empty slot
+        self.placements = array("B", [0]) * (AMOUNT_OF_RACES * SPOTS_PER_RACE)
+        self.scoreboard = ScoreBoard(len(self.tags))
+        self.validator = RaceValidator(len(self.tags))
+
+    @property
+    def amount_of_teams(self):
+        return len(self.tags)
+
+    def _slot(self, race, team):
+        return race * SPOTS_PER_RACE + team * self.format
+
+    def team_index(self, tag):
+        return self.tag_indexes.get(tag.casefold())
+
+    def team_tag(self, tag):
+        team = self.team_index(tag)
+        return self.tags[team] if team is not None else None
+
+    def tags_starting_with(self, prefix):
+        prefix = prefix.casefold()
+        return [tag for tag in self.tags if tag.casefold().startswith(prefix)]
+
+    def change_tag(self, old_tag, new_tag):
+        team = self.tag_indexes.pop(old_tag.casefold())
+        self.tags[team] = new_tag
+        self.tag_indexes[new_tag.casefold()] = team
+
+    def team_spots(self, race, team):
+        slot = self._slot(race, team)
+        return [spot for spot in self.placements[slot:slot + self.format] if spot != 0]
+
+    def has_spots(self, race, team):
+        return self.validator.has_entered(race, team)
+
+    def set_spots(self, race, team, spots):
+        if len(spots) > self.format:
+            raise ValueError(f"A team can't have more than {self.format} spots in a race")
+        slot = self._slot(race, team)
+        self.placements[slot:slot + self.format] = array("B", list(spots) + [0] * (self.format - len(spots)))
+        self.scoreboard.set_spots(race, team, spots)
+        self.validator.set_spots(race, team, spots)
+
+    def race_slots(self, race):
+        slot = race * SPOTS_PER_RACE
+        return self.placements[slot:slot + SPOTS_PER_RACE].tobytes()
+
+    def set_race_slots(self, race, slots):
+        for team in range(self.amount_of_teams):
+            slot = team * self.format
+            spots = [spot for spot in slots[slot:slot + self.format] if spot != 0]
+            if len(spots) != 0:
+                self.set_spots(race, team, spots)
+
+    def reset_race(self, race):
+        slot = race * SPOTS_PER_RACE
+        self.placements[slot:slot + SPOTS_PER_RACE] = array("B", [0]) * SPOTS_PER_RACE
+        self.scoreboard.reset_race(race)
+        self.validator.reset_race(race)
+
+    def total_score(self, team):
+        return self.scoreboard.total(team)
+
+    def copy(self):
+        mogi = Mogi.__new__(Mogi)
+        mogi.format = self.format
+        mogi.current_race = self.current_race
+        mogi.standings_message_id = self.standings_message_id
+        mogi.last_activity = self.last_activity
+        mogi.tags = list(self.tags)
+        mogi.tag_indexes = dict(self.tag_indexes)
+        mogi.placements = array("B", self.placements)
+        mogi.scoreboard = self.scoreboard.copy()
+        mogi.validator = self.validator.copy()
+        return mogi
+
+    @classmethod
+    def from_json(cls, location, last_activity=None):
+        teams = list(location["teams"].values())
+        mogi = cls(
+            location["format"], [team["tag"] for team in teams], location["current_race"],
+            location.get("standings_message_id"), location.get("last_activity", last_activity)
+        )
+        for race in range(AMOUNT_OF_RACES):
+            for team, spots in enumerate(location["races"][f"race{race}"].values()):
+                if len(spots) != 0:
+                    mogi.set_spots(race, team, spots)
+        return mogi
+
+    @classmethod
+    def from_compact(cls, data, last_activity=None):
+        # mogis saved before the activity was stored get the given fallback
+        format, tags, current_race, standings_message_id, races, *rest = data
+        mogi = cls(format, tags, current_race, standings_message_id, rest[0] if len(rest) != 0 else last_activity)
+        for race, teams in enumerate(races):
+            for team, spots in enumerate(teams):
+                if len(spots) != 0:
+                    mogi.set_spots(race, team, spots)
+        return mogi
+
+    def to_compact(self):
+        # [format, tags, current_race, standings_message_id, races x teams x spots, last_activity], races after the last entered one are left out
+        races = [[self.team_spots(race, team) for team in range(self.amount_of_teams)] for race in range(AMOUNT_OF_RACES)]
+        while len(races) != 0 and not any(races[-1]):
+            races.pop()
+        return [self.format, self.tags, self.current_race, self.standings_message_id, races, self.last_activity]
+
+    def to_json(self):
+        return {
+            "teams": {
+                f"team{team}": {"tag": tag, "total_score": self.total_score(team)} for team, tag in enumerate(self.tags)
+            },
+            "races": {
+                f"race{race}": {
+                    f"team{team}": self.team_spots(race, team) for team in range(self.amount_of_teams)
+                } for race in range(AMOUNT_OF_RACES)
+            },
+            "format": self.format,
+            "current_race": self.current_race,
+            "standings_message_id": self.standings_message_id,
+            "last_activity": self.last_activity
+        }
@@ -0,0 +1,50 @@
+import asyncio
+
+from utils.metrics import metrics
+
+
+class RenderScheduler:
+    def __init__(self):
+        # location -> the render waiting for the running one, None while nothing waits
+        self._running = {}
+        self._tasks = set()
+
+    async def render(self, location_id, render):
+        loop = asyncio.get_running_loop()
+        if location_id not in self._running:
+            self._running[location_id] = None
+            future = loop.create_future()
+            self._start(location_id, future, render)
+            metrics.inc("render_requests_total", "rendered")
+        else:
+            # the running render may use an older state, requests arriving now share the next one
+            pending = self._running[location_id]
+            if pending is None:
+                pending = self._running[location_id] = [loop.create_future(), render]
+                metrics.inc("render_requests_total", "rendered")
+            else:
+                # only the newest state is worth rendering
+                pending[1] = render
+                metrics.inc("render_requests_total", "coalesced")
+            future = pending[0]
+        return await asyncio.shield(future)
+
+    def _start(self, location_id, future, render):
+        task = asyncio.create_task(self._run(location_id, future, render))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, location_id, future, render):
+        try:
+            future.set_result(await render())
+        except Exception as error:
+            future.set_exception(error)
+        pending = self._running[location_id]
+        if pending is None:
+            del self._running[location_id]
+        else:
+            self._running[location_id] = None
+            self._start(location_id, *pending)
+
+
+render_scheduler = RenderScheduler()
@@ -0,0 +1,46 @@
+from array import array
+
+SPOT_POINTS = (0, 15, 12, 10, 9, 8, 7, 6, 5, 4, 3, 2, 1)
+AMOUNT_OF_RACES = 12
+
+
+def spots_to_points(spots):
+    points = 0
+    for spot in spots:
+        points += SPOT_POINTS[spot]
+    return points
+
+
+class ScoreBoard:
+    __slots__ = ("amount_of_teams", "race_points", "totals")
+
+    def __init__(self, amount_of_teams):
+        self.amount_of_teams = amount_of_teams
+        self.race_points = array("H", [0]) * (AMOUNT_OF_RACES * amount_of_teams)
+        self.totals = array("H", [0]) * amount_of_teams
+
+    def copy(self):
+        scoreboard = ScoreBoard.__new__(ScoreBoard)
+        scoreboard.amount_of_teams = self.amount_of_teams
+        scoreboard.race_points = array("H", self.race_points)
+        scoreboard.totals = array("H", self.totals)
+        return scoreboard
+
+    def set_spots(self, race, team, spots):
+        index = race * self.amount_of_teams + team
+        points = spots_to_points(spots)
+        self.totals[team] += points - self.race_points[index]
+        self.race_points[index] = points
+
+    def reset_race(self, race):
+        for team in range(self.amount_of_teams):
+            self.set_spots(race, team, ())
+
+    def total(self, team):
+        return self.totals[team]
+
+    def points(self, race, team):
+        return self.race_points[race * self.amount_of_teams + team]
+
+    def race_differential(self, race, team, other_team):
+        return self.points(race, team) - self.points(race, other_team)
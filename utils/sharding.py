@@ -0,0 +1,142 @@
+import asyncio
+import itertools
+import multiprocessing
+from multiprocessing.connection import wait
+
+
+def shard_of(guild_id, shard_count):
+    return (int(guild_id) >> 22) % shard_count
+
+
+def process_shard_ids(process, processes, shard_count):
+    return [shard_id for shard_id in range(shard_count) if shard_id % processes == process]
+
+
+class Coordinator:
+    # runs in the launcher process and relays admin calls between the bot processes
+    def __init__(self, connections):
+        self.connections = dict(enumerate(connections))
+        self._calls = {}
+
+    def run(self):
+        while len(self.connections) != 0:
+            for connection in wait(list(self.connections.values())):
+                process = next(process for process, other in self.connections.items() if other is connection)
+                try:
+                    message = connection.recv()
+                except EOFError:
+                    del self.connections[process]
+                    self._drop(process)
+                    continue
+                self._handle(process, message)
+
+    def _handle(self, process, message):
+        kind, request_id, payload = message
+        if kind == "broadcast":
+            call_id = (process, request_id)
+            self._calls[call_id] = [set(self.connections), []]
+            for connection in self.connections.values():
+                connection.send(("call", call_id, payload))
+        elif kind == "reply":
+            self._reply(process, request_id, payload)
+
+    def _reply(self, process, call_id, result):
+        call = self._calls.get(call_id)
+        if call is None:
+            return
+        waiting, results = call
+        waiting.discard(process)
+        if result is not None:
+            results.append(result)
+        if len(waiting) == 0:
+            del self._calls[call_id]
+            origin, request_id = call_id
+            if origin in self.connections:
+                self.connections[origin].send(("done", request_id, results))
+
+    def _drop(self, process):
+        # a process that exited won't answer anymore
+        for call_id in list(self._calls):
+            self._reply(process, call_id, None)
+
+
+class CoordinatorClient:
+    def __init__(self):
+        self.connection = None
+        self.handlers = {}
+        self._request_ids = itertools.count()
+        self._pending = {}
+        self._tasks = set()
+
+    def register(self, name, handler):
+        self.handlers[name] = handler
+
+    def start(self, connection):
+        self.connection = connection
+        asyncio.get_running_loop().add_reader(connection.fileno(), self._receive)
+
+    async def broadcast(self, name):
+        if self.connection is None:
+            return [await self.handlers[name]()]
+        request_id = next(self._request_ids)
+        future = self._pending[request_id] = asyncio.get_running_loop().create_future()
+        self.connection.send(("broadcast", request_id, name))
+        return await future
+
+    def _receive(self):
+        while self.connection is not None and self.connection.poll():
+            try:
+                kind, request_id, payload = self.connection.recv()
+            except EOFError:
+                self.close()
+                return
+            if kind == "call":
+                task = asyncio.create_task(self._call(request_id, payload))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            elif kind == "done":
+                future = self._pending.pop(request_id, None)
+                if future is not None and not future.done():
+                    future.set_result(payload)
+
+    async def _call(self, call_id, name):
+        handler = self.handlers.get(name)
+        try:
+            result = await handler() if handler is not None else None
+        except Exception as error:
+            result = f"{name} failed: {error}"
+        if self.connection is not None:
+            self.connection.send(("reply", call_id, result))
+
+    def close(self):
+        if self.connection is not None:
+            asyncio.get_running_loop().remove_reader(self.connection.fileno())
+            self.connection.close()
+            self.connection = None
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+
+
+def launch(target, processes, shard_count):
+    connections = []
+    children = []
+    for process in range(processes):
+        parent_connection, child_connection = multiprocessing.Pipe()
+        child = multiprocessing.Process(
+            target=target,
+            args=(process, process_shard_ids(process, processes, shard_count), shard_count, child_connection),
+            name=f"bot-{process}"
+        )
+        child.start()
+        child_connection.close()
+        connections.append(parent_connection)
+        children.append(child)
+    try:
+        Coordinator(connections).run()
+    finally:
+        for child in children:
+            child.join()
+
+
+coordinator = CoordinatorClient()
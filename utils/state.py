@@ -0,0 +1,312 @@
+import time
+import weakref
+import asyncio
+from contextlib import asynccontextmanager
+
+from utils.storage import JsonStorage, guild_of
+from utils.journal import mogi_changes, invert_changes, apply_changes
+from utils.metrics import metrics
+
+
+class LocationTransaction:
+    def __init__(self, location_id, mogi):
+        self.location_id = location_id
+        self.mogi = mogi.copy() if mogi is not None else None
+        self.deleted = False
+        self.replaced = False
+        self.undoing = False
+        self.undoable = True
+        self.archived = None
+        self.unarchived = []
+        self.restored = None
+
+    def replace(self, mogi):
+        self.mogi = mogi
+        self.deleted = False
+        self.replaced = True
+
+    def delete(self):
+        self.mogi = None
+        self.deleted = True
+
+    def archive(self, reason):
+        self.archived = (reason, self.mogi)
+        self.delete()
+
+    def restore(self, archive_id, reason, mogi):
+        self.replace(mogi)
+        self.unarchived = [archive_id]
+        self.restored = reason
+
+
+class MogiStateStore:
+    def __init__(self, storage=None, journal=None, flush_interval=5, archive=None, idle_ttl=7 * 24 * 3600, sweep_interval=600):
+        self.storage = storage if storage is not None else JsonStorage()
+        self.journal = journal
+        self.archive = archive
+        self.flush_interval = flush_interval
+        self.idle_ttl = idle_ttl
+        self.sweep_interval = sweep_interval
+        # called with the location and message id when a mogi's standings message is replaced or its mogi ends
+        self.on_standings_retired = None
+        self.loaded_guilds = set()
+        # unloaded guilds the sweep read and found without mogis, they stay unloaded
+        self.guilds_without_mogis = set()
+        self.servers = {}
+        self.restrictions = {}
+        self.current_locations = {}
+        self.dirty_servers = set()
+        self.dirty_locations = set()
+        self._flush_task = None
+        self._flush_lock = asyncio.Lock()
+        self._dirty_event = asyncio.Event()
+        self._sweep_task = None
+        self._locks = weakref.WeakValueDictionary()
+
+    @property
+    def dirty(self):
+        return len(self.dirty_servers) != 0 or len(self.dirty_locations) != 0
+
+    async def load(self, storage=None, journal=None):
+        if storage is not None:
+            self.storage = storage
+        if journal is not None:
+            self.journal = journal
+        with metrics.timer("state_load_seconds", "start"):
+            self.servers, self.current_locations = self.storage.load()
+        self.loaded_guilds = set()
+        self.guilds_without_mogis = set()
+        self.dirty_servers.clear()
+        self.dirty_locations.clear()
+        if self.journal is not None:
+            replayed_servers, replayed_locations = self.journal.replay(self.servers, self.current_locations, self.ensure_guild)
+            self.dirty_servers.update(replayed_servers)
+            self.dirty_locations.update(replayed_locations)
+        if self.dirty:
+            self._dirty_event.set()
+        self.restrictions = {
+            server_id: set(server.get("restricted_users", [])) for server_id, server in self.servers.items()
+        }
+
+    @property
+    def lazy(self):
+        return getattr(self.storage, "lazy", False)
+
+    def ensure_guild(self, guild_id):
+        if self.lazy and guild_id not in self.loaded_guilds:
+            with metrics.timer("state_load_seconds", "guild"):
+                shard = self.storage.load_guild(guild_id)
+            self._add_guild(guild_id, shard)
+
+    async def load_guild(self, guild_id):
+        if self.lazy and guild_id not in self.loaded_guilds:
+            shard = await self._read_guild(guild_id)
+            if guild_id not in self.loaded_guilds:
+                self._add_guild(guild_id, shard)
+
+    async def _read_guild(self, guild_id):
+        with metrics.timer("state_load_seconds", "guild"):
+            return await asyncio.to_thread(self.storage.load_guild, guild_id)
+
+    def _add_guild(self, guild_id, shard):
+        servers, locations = shard
+        self.loaded_guilds.add(guild_id)
+        for server_id, server in servers.items():
+            self.servers[server_id] = server
+            self.restrictions[server_id] = set(server.get("restricted_users", []))
+        for location_id, mogi in locations.items():
+            self.current_locations[location_id] = mogi
+
+    def to_json(self):
+        return {
+            "servers": self.servers,
+            "current_locations": {
+                location_id: mogi.to_json() for location_id, mogi in self.current_locations.items()
+            }
+        }
+
+    def mark_dirty(self, server_id=None, location_id=None):
+        if server_id is not None:
+            self.dirty_servers.add(server_id)
+            if self.journal is not None:
+                self.journal.record_server(server_id, self.servers.get(server_id))
+        if location_id is not None:
+            self.dirty_locations.add(location_id)
+        self._dirty_event.set()
+
+    def server(self, server_id):
+        self.ensure_guild(server_id)
+        server = self.servers.get(server_id)
+        if server is None:
+            server = self.servers[server_id] = {"restricted_users": []}
+            self.mark_dirty(server_id=server_id)
+        return server
+
+    def is_restricted(self, server_id, user_id):
+        self.ensure_guild(server_id)
+        return user_id in self.restrictions.get(server_id, ())
+
+    def set_restricted(self, server_id, user_id, restricted):
+        self.ensure_guild(server_id)
+        restricted_users = self.restrictions.setdefault(server_id, set())
+        if (user_id in restricted_users) == restricted:
+            return False
+        server = self.server(server_id)
+        if restricted:
+            restricted_users.add(user_id)
+            server["restricted_users"].append(user_id)
+        else:
+            restricted_users.discard(user_id)
+            server["restricted_users"].remove(user_id)
+        self.dirty_servers.add(server_id)
+        self._dirty_event.set()
+        if self.journal is not None:
+            self.journal.record_restriction(server_id, user_id, restricted)
+        return True
+
+    def lock(self, location_id):
+        lock = self._locks.get(location_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[location_id] = lock
+        return lock
+
+    @asynccontextmanager
+    async def transaction(self, location_id):
+        await self.load_guild(guild_of(location_id))
+        async with self.lock(location_id):
+            old_mogi = self.current_locations.get(location_id)
+            transaction = LocationTransaction(location_id, old_mogi)
+            yield transaction
+            mogi = None if transaction.deleted else transaction.mogi
+            if mogi is not None:
+                mogi.last_activity = int(time.time())
+            changes = mogi_changes(old_mogi, mogi, transaction.replaced)
+            if len(changes) == 0:
+                return
+            # the archive can fail, the state is only changed once it is done
+            if transaction.archived is not None and transaction.archived[1] is not None and self.archive is not None:
+                reason, archived_mogi = transaction.archived
+                changes.append(["x", self.archive.store(location_id, archived_mogi, reason)])
+                metrics.inc("mogis_archived_total", reason)
+            if transaction.restored is not None:
+                changes.append(["y", transaction.restored])
+            if self.archive is not None:
+                for archive_id in transaction.unarchived:
+                    self.archive.remove(archive_id)
+            if mogi is None:
+                self.current_locations.pop(location_id, None)
+            else:
+                self.current_locations[location_id] = mogi
+            if self.journal is not None:
+                self.journal.record_location(location_id, changes, transaction.undoing, transaction.undoable)
+            self.mark_dirty(location_id=location_id)
+            if self.on_standings_retired is not None and old_mogi is not None and old_mogi.standings_message_id is not None:
+                if mogi is None or mogi.standings_message_id != old_mogi.standings_message_id:
+                    self.on_standings_retired(location_id, old_mogi.standings_message_id)
+
+    def undo(self, transaction):
+        changes = self.journal.pop_last_changes(transaction.location_id) if self.journal is not None else None
+        if changes is None:
+            return False
+        restored = [change[1] for change in changes if change[0] == "y"]
+        if len(restored) != 0:
+            # a restored mogi goes back into the archive instead of being dropped
+            transaction.archived = (restored[-1], transaction.mogi)
+        transaction.mogi = apply_changes(transaction.mogi, invert_changes(changes))
+        transaction.deleted = transaction.mogi is None
+        transaction.undoing = True
+        # a finished mogi that is brought back mustn't be counted in the stats as well
+        transaction.unarchived = [change[1] for change in changes if change[0] == "x"]
+        return True
+
+    async def evict_idle(self):
+        now = time.time()
+        if self.lazy:
+            # guilds that weren't used since the start are only read when their file is old enough to hold idle mogis
+            unloaded_guilds = self.storage.guilds - self.loaded_guilds - self.guilds_without_mogis
+            for guild_id in await asyncio.to_thread(self.storage.guilds_saved_before, unloaded_guilds, now - self.idle_ttl):
+                shard = await self._read_guild(guild_id)
+                if guild_id in self.loaded_guilds:
+                    continue
+                if len(shard[1]) == 0:
+                    self.guilds_without_mogis.add(guild_id)
+                else:
+                    self._add_guild(guild_id, shard)
+        idle_locations = [
+            location_id for location_id, mogi in self.current_locations.items() if now - mogi.last_activity > self.idle_ttl
+        ]
+        for location_id in idle_locations:
+            async with self.transaction(location_id) as transaction:
+                # a command may have used the mogi while we waited for the lock
+                if transaction.mogi is not None and now - transaction.mogi.last_activity > self.idle_ttl:
+                    transaction.undoable = False
+                    transaction.archive("idle")
+            if self.journal is not None:
+                self.journal.history.pop(location_id, None)
+        return len(idle_locations)
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self.dirty:
+                return
+            seq = self.journal.seq if self.journal is not None else None
+            dirty_servers, self.dirty_servers = self.dirty_servers, set()
+            dirty_locations, self.dirty_locations = self.dirty_locations, set()
+            snapshot = self.storage.snapshot(self.servers, self.current_locations, dirty_servers, dirty_locations)
+            try:
+                with metrics.timer("state_flush_seconds"):
+                    await asyncio.to_thread(self.storage.save, *snapshot)
+            except Exception:
+                self.dirty_servers.update(dirty_servers)
+                self.dirty_locations.update(dirty_locations)
+                raise
+            if self.journal is not None:
+                await self.journal.compact(seq)
+
+    def start(self, flush_interval=None):
+        if flush_interval is not None:
+            self.flush_interval = flush_interval
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+        if self.journal is not None:
+            self.journal.start()
+        if self.archive is not None and self._sweep_task is None:
+            self._sweep_task = asyncio.create_task(self._sweep_loop())
+
+    async def _flush_loop(self):
+        while True:
+            await self._dirty_event.wait()
+            # changes made while waiting are written by the same flush
+            await asyncio.sleep(self.flush_interval)
+            self._dirty_event.clear()
+            try:
+                await self.flush()
+            except Exception as error:
+                self._dirty_event.set()
+                print(f"Couldn't save the state: {error}")
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await self.evict_idle()
+            except Exception as error:
+                print(f"Couldn't archive the idle mogis: {error}")
+
+    async def close(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        if self._sweep_task is not None:
+            self._sweep_task.cancel()
+            self._sweep_task = None
+        await self.flush()
+        if self.journal is not None:
+            await self.journal.close()
+        if self.archive is not None:
+            self.archive.close()
+        self.storage.close()
+
+
+state_store = MogiStateStore()
@@ -0,0 +1,471 @@
+import os
+import json
+import time
+import sqlite3
+import argparse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+from utils.mogi import Mogi
+from utils.scoring import AMOUNT_OF_RACES
+
+
+def atomic_write(path, data):
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as temp_file:
+        temp_file.write(data)
+        temp_file.flush()
+        os.fsync(temp_file.fileno())
+    os.replace(temp_path, path)
+
+
+def copy_server(server):
+    # server settings are edited in place, mogis are never changed after a commit
+    return dict(server, restricted_users=list(server.get("restricted_users", [])))
+
+
+STATE_VERSION = 3
+CODECS = ("json", "orjson", "msgpack")
+
+
+def decode_state(data):
+    if len(data) == 0:
+        return {}
+    # a json file starts with "{", a msgpack one with a map header
+    if data[:1] == b"{":
+        return orjson.loads(data) if orjson is not None else json.loads(data)
+    if msgpack is None:
+        raise RuntimeError("The state file is msgpack encoded, but msgpack isn't installed")
+    return msgpack.unpackb(data, strict_map_key=False)
+
+
+def read_state(raw, last_activity=None):
+    # returns servers, locations and whether the data had the legacy layout
+    data = decode_state(raw)
+    if "version" not in data and "current_locations" in data:
+        locations = {
+            location_id: Mogi.from_json(location, last_activity) for location_id, location in data["current_locations"].items()
+        }
+        return data.get("servers", {}), locations, True
+    if data.get("version", STATE_VERSION) > STATE_VERSION:
+        raise RuntimeError(f"State format version {data['version']} is newer than the supported version {STATE_VERSION}")
+    locations = {
+        location_id: Mogi.from_compact(location, last_activity) for location_id, location in data.get("locations", {}).items()
+    }
+    return data.get("servers", {}), locations, False
+
+
+def encode_legacy_state(servers, locations):
+    return json.dumps({
+        "servers": servers,
+        "current_locations": {location_id: mogi.to_json() for location_id, mogi in locations.items()}
+    }, indent=4).encode()
+
+
+def check_codec(codec):
+    if codec not in CODECS:
+        raise ValueError(f"Unknown state codec {codec}, use one of {', '.join(CODECS)}")
+    if codec == "orjson" and orjson is None or codec == "msgpack" and msgpack is None:
+        raise RuntimeError(f"The {codec} state codec needs the {codec} package")
+
+
+class JsonStorage:
+    def __init__(self, path="cogs/current_data.json", codec="json"):
+        check_codec(codec)
+        self.path = path
+        self.codec = codec
+
+    def load(self):
+        try:
+            with open(self.path, "rb") as state_file:
+                raw = state_file.read()
+                # mogis saved without their activity were last changed before the file was written
+                last_activity = int(os.fstat(state_file.fileno()).st_mtime)
+        except FileNotFoundError:
+            raw = b""
+            last_activity = None
+        servers, locations, legacy = read_state(raw, last_activity)
+        if legacy:
+            # keep the legacy file around and switch to the compact format right away
+            atomic_write(f"{self.path}.legacy", raw)
+            self.save(servers, locations, set(servers), set(locations))
+            print(f"Migrated {self.path} to state format version {STATE_VERSION}, the old file is kept as {self.path}.legacy")
+        return servers, locations
+
+    @staticmethod
+    def snapshot(servers, locations, dirty_servers, dirty_locations):
+        return {server_id: copy_server(server) for server_id, server in servers.items()}, dict(locations), dirty_servers, dirty_locations
+
+    def save(self, servers, locations, dirty_servers, dirty_locations):
+        # one encode call per entry, a single call would hold the GIL and stall the event loop until the whole state is encoded
+        if self.codec == "msgpack":
+            data = self._encode_msgpack(servers, locations)
+        else:
+            data = self._encode_json(servers, locations)
+        atomic_write(self.path, data)
+
+    def _encode_json(self, servers, locations):
+        if self.codec == "orjson":
+            dumps = orjson.dumps
+        else:
+            encode = json.JSONEncoder(separators=(",", ":")).encode
+            dumps = lambda value: encode(value).encode()
+        return b"".join((
+            b'{"version":%d,"servers":{' % STATE_VERSION,
+            b",".join(dumps(server_id) + b":" + dumps(server) for server_id, server in servers.items()),
+            b'},"locations":{',
+            b",".join(dumps(location_id) + b":" + dumps(mogi.to_compact()) for location_id, mogi in locations.items()),
+            b"}}"
+        ))
+
+    @staticmethod
+    def _encode_msgpack(servers, locations):
+        packer = msgpack.Packer()
+        parts = [packer.pack_map_header(3), packer.pack("version"), packer.pack(STATE_VERSION)]
+        parts += [packer.pack("servers"), packer.pack_map_header(len(servers))]
+        for server_id, server in servers.items():
+            parts += [packer.pack(server_id), packer.pack(server)]
+        parts += [packer.pack("locations"), packer.pack_map_header(len(locations))]
+        for location_id, mogi in locations.items():
+            parts += [packer.pack(location_id), packer.pack(mogi.to_compact())]
+        return b"".join(parts)
+
+    def close(self):
+        pass
+
+
+def guild_of(location_id):
+    return location_id.split("-", 1)[0]
+
+
+class ShardedJsonStorage:
+    # one file per guild, guilds are only read when they are first used
+    lazy = True
+    SUFFIX = ".state"
+
+    def __init__(self, directory="cogs/state", codec="json", import_path="cogs/current_data.json"):
+        check_codec(codec)
+        self.directory = directory
+        self.codec = codec
+        self.import_path = import_path
+        # set when several processes share the directory, every one only indexes the guilds of its shards
+        self.owns = None
+        self.guilds = set()
+
+    def _path(self, guild_id):
+        return os.path.join(self.directory, f"{guild_id}{self.SUFFIX}")
+
+    def load(self):
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+            if self.import_path is not None and os.path.exists(self.import_path):
+                servers, locations = read_state_file(self.import_path)
+                self.save(servers, locations, set(servers), set(locations))
+                print(f"Split {self.import_path} into {len(self.guilds)} guild files in {self.directory}")
+        self.guilds = {
+            entry.name[:-len(self.SUFFIX)] for entry in os.scandir(self.directory) if entry.name.endswith(self.SUFFIX)
+        }
+        if self.owns is not None:
+            # files that aren't named after a guild id belong to no shard
+            self.guilds = {guild_id for guild_id in self.guilds if guild_id.isdigit() and self.owns(guild_id)}
+        return {}, {}
+
+    def load_guild(self, guild_id):
+        if guild_id not in self.guilds:
+            return {}, {}
+        with open(self._path(guild_id), "rb") as state_file:
+            servers, locations, legacy = read_state(state_file.read(), int(os.fstat(state_file.fileno()).st_mtime))
+        return servers, locations
+
+    def guilds_saved_before(self, guild_ids, timestamp):
+        # every mogi is saved after its last change, so a file older than the timestamp only holds mogis idle since then
+        idle_guilds = []
+        for guild_id in guild_ids:
+            try:
+                if os.path.getmtime(self._path(guild_id)) < timestamp:
+                    idle_guilds.append(guild_id)
+            except FileNotFoundError:
+                pass
+        return idle_guilds
+
+    @staticmethod
+    def snapshot(servers, locations, dirty_servers, dirty_locations):
+        guild_ids = set(dirty_servers)
+        guild_ids.update(guild_of(location_id) for location_id in dirty_locations)
+        return (
+            {guild_id: copy_server(servers[guild_id]) for guild_id in guild_ids if guild_id in servers},
+            {location_id: mogi for location_id, mogi in locations.items() if guild_of(location_id) in guild_ids},
+            dirty_servers,
+            dirty_locations
+        )
+
+    def save(self, servers, locations, dirty_servers, dirty_locations):
+        shards = {guild_id: ({}, {}) for guild_id in dirty_servers}
+        for location_id in dirty_locations:
+            shards.setdefault(guild_of(location_id), ({}, {}))
+        for guild_id, (shard_servers, shard_locations) in shards.items():
+            if guild_id in servers:
+                shard_servers[guild_id] = servers[guild_id]
+        for location_id, mogi in locations.items():
+            shard = shards.get(guild_of(location_id))
+            if shard is not None:
+                shard[1][location_id] = mogi
+        for guild_id, (shard_servers, shard_locations) in shards.items():
+            if len(shard_servers) == 0 and len(shard_locations) == 0:
+                try:
+                    os.remove(self._path(guild_id))
+                except FileNotFoundError:
+                    pass
+                self.guilds.discard(guild_id)
+                continue
+            JsonStorage(self._path(guild_id), self.codec).save(shard_servers, shard_locations, set(), set())
+            self.guilds.add(guild_id)
+
+    def close(self):
+        pass
+
+
+class SqliteStorage:
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS servers (
+            guild_id TEXT PRIMARY KEY,
+            settings TEXT NOT NULL DEFAULT '{}'
+        );
+        CREATE TABLE IF NOT EXISTS restricted_users (
+            guild_id TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            PRIMARY KEY (guild_id, user_id)
+        );
+        CREATE TABLE IF NOT EXISTS locations (
+            location_id TEXT PRIMARY KEY,
+            guild_id TEXT NOT NULL,
+            channel_id TEXT NOT NULL,
+            format INTEGER NOT NULL,
+            current_race INTEGER NOT NULL,
+            standings_message_id INTEGER,
+            last_activity INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS locations_guild ON locations (guild_id);
+        CREATE INDEX IF NOT EXISTS locations_channel ON locations (channel_id);
+        CREATE TABLE IF NOT EXISTS teams (
+            location_id TEXT NOT NULL,
+            team INTEGER NOT NULL,
+            tag TEXT NOT NULL,
+            PRIMARY KEY (location_id, team)
+        );
+        CREATE TABLE IF NOT EXISTS placements (
+            location_id TEXT NOT NULL,
+            race INTEGER NOT NULL,
+            slots BLOB NOT NULL,
+            PRIMARY KEY (location_id, race)
+        );
+    """
+
+    def __init__(self, path="cogs/current_data.sqlite3"):
+        self.path = path
+        self.connection = None
+        # what was last written, so a save only touches the rows that changed
+        self._written_servers = {}
+        self._written_locations = {}
+
+    def connect(self):
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.executescript(self.SCHEMA)
+            columns = [column[1] for column in self.connection.execute("PRAGMA table_info(locations)")]
+            if "standings_message_id" not in columns:
+                self.connection.execute("ALTER TABLE locations ADD COLUMN standings_message_id INTEGER")
+            if "last_activity" not in columns:
+                # the activity of older mogis is unknown, they count as active from the upgrade on
+                with self.connection:
+                    self.connection.execute("ALTER TABLE locations ADD COLUMN last_activity INTEGER")
+                    self.connection.execute("UPDATE locations SET last_activity = ?", (int(time.time()),))
+        return self.connection
+
+    def load(self):
+        connection = self.connect()
+        servers = {}
+        for guild_id, settings in connection.execute("SELECT guild_id, settings FROM servers"):
+            servers[guild_id] = {"restricted_users": [], **json.loads(settings)}
+        for guild_id, user_id in connection.execute("SELECT guild_id, user_id FROM restricted_users ORDER BY rowid"):
+            servers.setdefault(guild_id, {"restricted_users": []})["restricted_users"].append(user_id)
+
+        tags = {}
+        for location_id, team, tag in connection.execute("SELECT location_id, team, tag FROM teams ORDER BY location_id, team"):
+            tags.setdefault(location_id, []).append(tag)
+        locations = {}
+        for location_id, format, current_race, standings_message_id, last_activity in connection.execute(
+                "SELECT location_id, format, current_race, standings_message_id, last_activity FROM locations"):
+            locations[location_id] = Mogi(format, tags.get(location_id, []), current_race, standings_message_id, last_activity)
+        for location_id, race, slots in connection.execute("SELECT location_id, race, slots FROM placements"):
+            mogi = locations.get(location_id)
+            if mogi is not None:
+                mogi.set_race_slots(race, slots)
+
+        self._written_servers = {guild_id: self._server_row(server) for guild_id, server in servers.items()}
+        self._written_locations = {location_id: self._location_rows(mogi) for location_id, mogi in locations.items()}
+        return servers, locations
+
+    @staticmethod
+    def _server_row(server):
+        settings = {key: value for key, value in server.items() if key != "restricted_users"}
+        return json.dumps(settings, sort_keys=True), set(server.get("restricted_users", []))
+
+    @staticmethod
+    def _location_rows(mogi):
+        return (
+            (mogi.format, mogi.current_race, mogi.standings_message_id, mogi.last_activity),
+            tuple(mogi.tags),
+            [mogi.race_slots(race) for race in range(AMOUNT_OF_RACES)]
+        )
+
+    @staticmethod
+    def snapshot(servers, locations, dirty_servers, dirty_locations):
+        return (
+            {server_id: copy_server(servers[server_id]) for server_id in dirty_servers if server_id in servers},
+            {location_id: locations.get(location_id) for location_id in dirty_locations},
+            dirty_servers,
+            dirty_locations
+        )
+
+    def save(self, servers, locations, dirty_servers, dirty_locations):
+        connection = self.connect()
+        with connection:
+            for guild_id in dirty_servers:
+                self._save_server(connection, guild_id, servers.get(guild_id))
+            for location_id in dirty_locations:
+                self._save_location(connection, location_id, locations.get(location_id))
+
+    def _save_server(self, connection, guild_id, server):
+        if server is None:
+            connection.execute("DELETE FROM servers WHERE guild_id = ?", (guild_id,))
+            connection.execute("DELETE FROM restricted_users WHERE guild_id = ?", (guild_id,))
+            self._written_servers.pop(guild_id, None)
+            return
+        settings, restricted_users = self._server_row(server)
+        written_settings, written_users = self._written_servers.get(guild_id, (None, set()))
+        if settings != written_settings:
+            connection.execute(
+                "INSERT INTO servers (guild_id, settings) VALUES (?, ?) "
+                "ON CONFLICT (guild_id) DO UPDATE SET settings = excluded.settings",
+                (guild_id, settings)
+            )
+        connection.executemany(
+            "INSERT OR IGNORE INTO restricted_users (guild_id, user_id) VALUES (?, ?)",
+            [(guild_id, user_id) for user_id in server.get("restricted_users", []) if user_id not in written_users]
+        )
+        connection.executemany(
+            "DELETE FROM restricted_users WHERE guild_id = ? AND user_id = ?",
+            [(guild_id, user_id) for user_id in written_users - restricted_users]
+        )
+        self._written_servers[guild_id] = (settings, restricted_users)
+
+    def _save_location(self, connection, location_id, mogi):
+        if mogi is None:
+            for table in ("locations", "teams", "placements"):
+                connection.execute(f"DELETE FROM {table} WHERE location_id = ?", (location_id,))
+            self._written_locations.pop(location_id, None)
+            return
+        meta, tags, races = self._location_rows(mogi)
+        written = self._written_locations.get(location_id)
+        if written is None:
+            for table in ("teams", "placements"):
+                connection.execute(f"DELETE FROM {table} WHERE location_id = ?", (location_id,))
+            written_meta, written_tags, written_races = None, (), [None] * AMOUNT_OF_RACES
+        else:
+            written_meta, written_tags, written_races = written
+        if meta != written_meta:
+            guild_id, channel_id = location_id.split("-", 1)
+            connection.execute(
+                "INSERT INTO locations (location_id, guild_id, channel_id, format, current_race, standings_message_id, last_activity) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (location_id) DO UPDATE SET format = excluded.format, current_race = excluded.current_race, "
+                "standings_message_id = excluded.standings_message_id, last_activity = excluded.last_activity",
+                (location_id, guild_id, channel_id, *meta)
+            )
+        if tags != written_tags:
+            connection.execute("DELETE FROM teams WHERE location_id = ?", (location_id,))
+            connection.executemany(
+                "INSERT INTO teams (location_id, team, tag) VALUES (?, ?, ?)",
+                [(location_id, team, tag) for team, tag in enumerate(tags)]
+            )
+        connection.executemany(
+            "INSERT INTO placements (location_id, race, slots) VALUES (?, ?, ?) "
+            "ON CONFLICT (location_id, race) DO UPDATE SET slots = excluded.slots",
+            [(location_id, race, slots) for race, slots in enumerate(races) if slots != written_races[race]]
+        )
+        self._written_locations[location_id] = (meta, tags, races)
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def create_storage(backend="shards", path=None, codec="json"):
+    if backend == "sqlite":
+        return SqliteStorage(path or "cogs/current_data.sqlite3")
+    if backend == "shards":
+        return ShardedJsonStorage(path or "cogs/state", codec)
+    return JsonStorage(path or "cogs/current_data.json", codec)
+
+
+def read_state_file(path):
+    with open(path, "rb") as state_file:
+        servers, locations, legacy = read_state(state_file.read(), int(os.fstat(state_file.fileno()).st_mtime))
+    return servers, locations
+
+
+def migrate(json_path, sqlite_path):
+    servers, locations = read_state_file(json_path)
+    storage = SqliteStorage(sqlite_path)
+    storage.save(servers, locations, set(servers), set(locations))
+    storage.close()
+    print(f"Migrated {len(servers)} servers and {len(locations)} mogis from {json_path} to {sqlite_path}")
+
+
+def convert(source_path, target_path, layout="compact", codec="json"):
+    start = time.perf_counter()
+    servers, locations = read_state_file(source_path)
+    loaded = time.perf_counter()
+    if layout == "legacy":
+        atomic_write(target_path, encode_legacy_state(servers, locations))
+    else:
+        JsonStorage(target_path, codec).save(servers, locations, set(servers), set(locations))
+    stored = time.perf_counter()
+    print(
+        f"Converted {len(servers)} servers and {len(locations)} mogis: "
+        f"{os.path.getsize(source_path) / 1024:.1f} KiB -> {os.path.getsize(target_path) / 1024:.1f} KiB, "
+        f"load {(loaded - start) * 1e3:.1f} ms, store {(stored - loaded) * 1e3:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m utils.storage")
+    commands = parser.add_subparsers(dest="command", required=True)
+    convert_parser = commands.add_parser("convert", help="Convert a state file between the legacy and the compact format")
+    convert_parser.add_argument("source")
+    convert_parser.add_argument("target")
+    convert_parser.add_argument("--to", choices=["compact", "legacy"], default="compact")
+    convert_parser.add_argument("--codec", choices=CODECS, default="json")
+    migrate_parser = commands.add_parser("migrate", help="Copy a json state file into a sqlite database")
+    migrate_parser.add_argument("source")
+    migrate_parser.add_argument("target")
+    args = parser.parse_args()
+    try:
+        if args.command == "convert":
+            convert(args.source, args.target, args.to, args.codec)
+        else:
+            migrate(args.source, args.target)
+    except RuntimeError as error:
+        parser.error(str(error))
@@ -0,0 +1,58 @@
+import asyncio
+from io import BytesIO
+
+import aiohttp
+
+
+class TableImageClient:
+    def __init__(self, base_url="https://gb.hlorenzi.com/table.png?data=", timeout=10, max_concurrency=8, retries=3, backoff=0.5):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.session = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def start(self, base_url=None, timeout=None):
+        if base_url is not None:
+            self.base_url = base_url
+        if timeout is not None:
+            self.timeout = timeout
+        if self.session is None:
+            self.session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency)
+            )
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def fetch(self, url):
+        if self.session is None:
+            await self.start()
+        async with self._semaphore:
+            for attempt in range(self.retries + 1):
+                try:
+                    return await self._download(url)
+                except aiohttp.ClientResponseError as error:
+                    if error.status < 500 and error.status != 429 or attempt == self.retries:
+                        raise
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    if attempt == self.retries:
+                        raise
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+
+    async def _download(self, url):
+        async with self.session.get(url) as response:
+            response.raise_for_status()
+            table_bytes = BytesIO()
+            async for chunk in response.content.iter_chunked(16384):
+                table_bytes.write(chunk)
+        table_bytes.seek(0)
+        return table_bytes
+
+
+table_client = TableImageClient()
@@ -0,0 +1,98 @@
+import asyncio
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:
+    Image = None
+
+
+WIDTH = 480
+TITLE_HEIGHT = 56
+ROW_HEIGHT = 44
+BACKGROUND_COLOR = (24, 26, 33)
+TITLE_COLOR = (255, 255, 255)
+ROW_COLORS = [(44, 47, 58), (36, 39, 48)]
+TEXT_COLOR = (230, 230, 230)
+DIFFERENCE_COLOR = (150, 155, 170)
+
+
+def load_font(size):
+    try:
+        return ImageFont.truetype("DejaVuSans-Bold.ttf", size)
+    except OSError:
+        return ImageFont.load_default()
+
+
+def parse_table_text(table_text):
+    title = ""
+    teams = []
+    for line in table_text.split("\n"):
+        if line.startswith("#title "):
+            title = line[len("#title "):]
+        elif line.strip():
+            tag, score = line.rsplit(" ", 1)
+            teams.append((tag, int(score)))
+    return title, teams
+
+
+def render_table(table_text):
+    title, teams = parse_table_text(table_text)
+    teams = sorted(teams, key=lambda team: team[1], reverse=True)
+    image = Image.new("RGB", (WIDTH, TITLE_HEIGHT + ROW_HEIGHT * len(teams) + 8), BACKGROUND_COLOR)
+    draw = ImageDraw.Draw(image)
+    title_font = load_font(24)
+    row_font = load_font(22)
+    small_font = load_font(16)
+
+    draw.text((WIDTH // 2, TITLE_HEIGHT // 2), title, fill=TITLE_COLOR, font=title_font, anchor="mm")
+    rank = 0
+    previous_score = None
+    for index, (tag, score) in enumerate(teams):
+        if score != previous_score:
+            rank = index + 1
+        top = TITLE_HEIGHT + index * ROW_HEIGHT
+        middle = top + ROW_HEIGHT // 2
+        draw.rectangle((8, top, WIDTH - 8, top + ROW_HEIGHT - 4), fill=ROW_COLORS[index % 2])
+        draw.text((32, middle), str(rank), fill=TEXT_COLOR, font=row_font, anchor="mm")
+        draw.text((64, middle), tag, fill=TEXT_COLOR, font=row_font, anchor="lm")
+        draw.text((WIDTH - 96, middle), str(score), fill=TEXT_COLOR, font=row_font, anchor="rm")
+        if previous_score is not None and score != previous_score:
+            draw.text((WIDTH - 24, middle), f"-{previous_score - score}", fill=DIFFERENCE_COLOR, font=small_font, anchor="rm")
+        previous_score = score
+
+    image_bytes = BytesIO()
+    image.save(image_bytes, "PNG")
+    return image_bytes.getvalue()
+
+
+class LocalTableRenderer:
+    def __init__(self, max_workers=2):
+        self.max_workers = max_workers
+        self.pool = None
+
+    @property
+    def available(self):
+        return Image is not None
+
+    def start(self, max_workers=None):
+        if max_workers is not None:
+            self.max_workers = max_workers
+        if self.available and self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.max_workers)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+    async def render(self, table_text):
+        if self.pool is None:
+            self.start()
+        loop = asyncio.get_running_loop()
+        table_png = await loop.run_in_executor(self.pool, render_table, table_text)
+        return BytesIO(table_png)
+
+
+table_renderer = LocalTableRenderer()
@@ -0,0 +1,100 @@
+from array import array
+
+from utils.scoring import AMOUNT_OF_RACES
+
+FULL_RACE = (1 << 12) - 1
+
+
+def spot_bit(spot):
+    return 1 << (spot - 1)
+
+
+def mask_to_spots(mask):
+    return [spot for spot in range(1, 13) if mask & spot_bit(spot)]
+
+
+class RaceValidator:
+    __slots__ = ("amount_of_teams", "team_masks", "team_duplicates", "occupied", "duplicates", "entered", "error_mask")
+
+    def __init__(self, amount_of_teams):
+        self.amount_of_teams = amount_of_teams
+        self.team_masks = array("H", [0]) * (AMOUNT_OF_RACES * amount_of_teams)
+        self.team_duplicates = array("H", [0]) * (AMOUNT_OF_RACES * amount_of_teams)
+        self.occupied = array("H", [0]) * AMOUNT_OF_RACES
+        self.duplicates = array("H", [0]) * AMOUNT_OF_RACES
+        self.entered = array("H", [0]) * AMOUNT_OF_RACES
+        self.error_mask = 0
+
+    def copy(self):
+        validator = RaceValidator.__new__(RaceValidator)
+        validator.amount_of_teams = self.amount_of_teams
+        validator.team_masks = array("H", self.team_masks)
+        validator.team_duplicates = array("H", self.team_duplicates)
+        validator.occupied = array("H", self.occupied)
+        validator.duplicates = array("H", self.duplicates)
+        validator.entered = array("H", self.entered)
+        validator.error_mask = self.error_mask
+        return validator
+
+    def set_spots(self, race, team, spots):
+        mask = 0
+        duplicates = 0
+        for spot in spots:
+            bit = spot_bit(spot)
+            duplicates |= mask & bit
+            mask |= bit
+        index = race * self.amount_of_teams + team
+        self.team_masks[index] = mask
+        self.team_duplicates[index] = duplicates
+        if len(spots) != 0:
+            self.entered[race] |= 1 << team
+        else:
+            self.entered[race] &= ~(1 << team)
+        self._check_race(race)
+
+    def reset_race(self, race):
+        for team in range(self.amount_of_teams):
+            index = race * self.amount_of_teams + team
+            self.team_masks[index] = 0
+            self.team_duplicates[index] = 0
+        self.entered[race] = 0
+        self._check_race(race)
+
+    def _check_race(self, race):
+        occupied = 0
+        duplicates = 0
+        start = race * self.amount_of_teams
+        for index in range(start, start + self.amount_of_teams):
+            mask = self.team_masks[index]
+            duplicates |= (occupied & mask) | self.team_duplicates[index]
+            occupied |= mask
+        self.occupied[race] = occupied
+        self.duplicates[race] = duplicates
+        if self.entered[race] != 0 and occupied != FULL_RACE:
+            self.error_mask |= 1 << race
+        else:
+            self.error_mask &= ~(1 << race)
+
+    def is_complete(self, race):
+        return self.occupied[race] == FULL_RACE
+
+    def is_duplicate(self, race, spot):
+        return self.duplicates[race] & spot_bit(spot) != 0
+
+    def has_duplicates(self, race):
+        return self.duplicates[race] != 0
+
+    def has_entered(self, race, team):
+        return self.entered[race] & (1 << team) != 0
+
+    def amount_entered(self, race):
+        return bin(self.entered[race]).count("1")
+
+    def missing_spots(self, race):
+        return mask_to_spots(~self.occupied[race] & FULL_RACE)
+
+    def duplicate_spots(self, race):
+        return mask_to_spots(self.duplicates[race])
+
+    def races_with_errors(self):
+        return [race for race in range(AMOUNT_OF_RACES) if self.error_mask & (1 << race)]
@@ -0,0 +1,98 @@
+import json
+import time
+import asyncio
+import secrets
+
+from utils.storage import atomic_write
+
+
+class Vote:
+    __slots__ = ("kind", "location_id", "user_id", "data", "expires_at", "yes", "no")
+
+    def __init__(self, kind, location_id, user_id, data, expires_at, yes=(), no=()):
+        self.kind = kind
+        self.location_id = location_id
+        self.user_id = user_id
+        self.data = data
+        self.expires_at = expires_at
+        self.yes = set(yes)
+        self.no = set(no)
+
+    def to_json(self):
+        return [self.kind, self.location_id, self.user_id, self.data, self.expires_at, sorted(self.yes), sorted(self.no)]
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(*data)
+
+
+class VoteRegistry:
+    def __init__(self, path="cogs/votes.json", ttl=15 * 60, max_per_location=3):
+        self.path = path
+        self.ttl = ttl
+        self.max_per_location = max_per_location
+        self.votes = {}
+        self._location_votes = {}
+        self._save_lock = asyncio.Lock()
+
+    def load(self):
+        try:
+            with open(self.path, "rb") as votes_file:
+                data = json.loads(votes_file.read() or b"{}")
+        except FileNotFoundError:
+            data = {}
+        self.votes = {}
+        self._location_votes = {}
+        for vote_id, vote in data.items():
+            self._add(vote_id, Vote.from_json(vote))
+        self.expire()
+
+    def _add(self, vote_id, vote):
+        self.votes[vote_id] = vote
+        self._location_votes.setdefault(vote.location_id, []).append(vote_id)
+
+    def _remove(self, vote_id):
+        vote = self.votes.pop(vote_id, None)
+        if vote is None:
+            return
+        location_votes = self._location_votes[vote.location_id]
+        location_votes.remove(vote_id)
+        if len(location_votes) == 0:
+            del self._location_votes[vote.location_id]
+
+    def expire(self, now=None):
+        now = time.time() if now is None else now
+        expired = [vote_id for vote_id, vote in self.votes.items() if vote.expires_at <= now]
+        for vote_id in expired:
+            self._remove(vote_id)
+        return len(expired)
+
+    async def create(self, kind, location_id, user_id, data, yes=()):
+        self.expire()
+        location_votes = self._location_votes.get(location_id, [])
+        # the oldest votes of a location make room, their buttons answer that the vote expired
+        for vote_id in location_votes[:len(location_votes) - self.max_per_location + 1]:
+            self._remove(vote_id)
+        vote_id = secrets.token_urlsafe(6)
+        self._add(vote_id, Vote(kind, location_id, user_id, data, time.time() + self.ttl, yes))
+        await self.save()
+        return vote_id
+
+    def get(self, vote_id):
+        vote = self.votes.get(vote_id)
+        if vote is not None and vote.expires_at <= time.time():
+            self._remove(vote_id)
+            return None
+        return vote
+
+    async def finish(self, vote_id):
+        self._remove(vote_id)
+        await self.save()
+
+    async def save(self):
+        async with self._save_lock:
+            data = json.dumps({vote_id: vote.to_json() for vote_id, vote in self.votes.items()}, separators=(",", ":")).encode()
+            await asyncio.to_thread(atomic_write, self.path, data)
+
+
+vote_registry = VoteRegistry()